@@ -1,14 +1,29 @@
+import os
 import streamlit as st
-import threading
 import time
 from datetime import datetime
-import re
 
 # Import your existing modules
-from voice_agent import record_until_silence, transcribe_audio, synthesize_speech, play_audio
-from llm_engine import generate_response
-from calendar_api import authenticate_google_calendar, create_meeting
-from main import parse_datetime_from_text, synthesize_and_speak
+from voice_agent import record_until_silence, stop_listening, transcribe_audio, prewarm_tts, stop_speaking, is_speaking, respond_and_speak, synthesize_and_speak, get_tts_backend, TEXT_ONLY
+from voice_worker import VoiceWorker, VoiceSlot
+from llm_engine import generate_response, extract_booking
+from calendar_api import get_discovery_document, create_meeting, list_events
+from booking_flow import BookingFlow, describe_events, PROMPTS as FLOW_PROMPTS
+from session_manager import SessionManager, LOCAL_USER
+import asr_worker
+from datetime_parser import parse_datetime
+
+GREETING = "Hello! I'm ready to help you schedule meetings!"
+
+# Fixed replies worth keeping in the TTS cache
+FIXED_PHRASES = [GREETING] + list(FLOW_PROMPTS.values())
+
+# Seconds between checks for news from the voice worker
+POLL_INTERVAL = 0.5
+# A voice worker whose page stopped polling for this long is shut down; generous,
+# since browsers throttle timers in background tabs
+HEARTBEAT_TIMEOUT = 60
+BARGE_IN = os.getenv("VOICE_BARGE_IN", "1").lower() in ("1", "true", "yes")
 
 # Page configuration
 st.set_page_config(page_title="Smart Scheduler AI", page_icon="🤖", layout="wide")
@@ -31,15 +46,59 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Process-wide resources, shared by every browser tab and built once
+@st.cache_resource(show_spinner=False)
+def get_session_manager():
+    return SessionManager()
+
+@st.cache_resource(show_spinner=False)
+def get_calendar_discovery():
+    return get_discovery_document()
+
+@st.cache_resource(show_spinner="Loading speech recognition...")
+def get_transcription_server():
+    server = asr_worker.get_server()
+    server.warm_up()
+    return server
+
+@st.cache_resource(show_spinner=False)
+def get_speech_backend():
+    return get_tts_backend()
+
+@st.cache_resource(show_spinner=False)
+def get_voice_slot():
+    return VoiceSlot()
+
+def current_user_id():
+    """The signed-in user's email when Streamlit auth is set up, otherwise the shared local user."""
+    email = getattr(getattr(st, 'user', None), 'email', None)
+    return email or LOCAL_USER
+
+def user_session():
+    return get_session_manager().get(current_user_id())
+
+def calendar_service():
+    """This user's Calendar client; PermissionError until they connect their calendar."""
+    get_calendar_discovery()
+    return user_session().calendar_service()
+
+def connect_calendar():
+    """Run the consent flow; only ever called from the Connect button."""
+    try:
+        user_session().authorize()
+        st.session_state.calendar_connected = True
+    except Exception as e:
+        add_message("system", f"❌ Could not connect the calendar: {str(e)[:50]}...")
+
 def init_session_state():
     defaults = {
         'conversation_history': [],
-        'calendar_service': None,
+        'calendar_connected': False,
         'is_active': False,
         'current_step': 'ready',
-        'meeting_step': 'none',  # none -> time -> title -> duration -> confirm -> create
-        'temp_meeting': {},
-        'text_input_key': 0
+        'text_input_key': 0,
+        'text_only': TEXT_ONLY,
+        'voice_worker': None
     }
     
     for key, value in defaults.items():
@@ -96,6 +155,7 @@ def display_status():
         'ready': ('🟢 Ready - Say something!', 'status-ready'),
         'listening': ('🎙️ Listening...', 'status-listening'),
         'processing': ('⚙️ Processing...', 'status-processing'),
+        'speaking': ('🔊 Speaking...', 'status-processing'),
     }
     
     text, css_class = status_map.get(st.session_state.current_step, ('🟢 Ready', 'status-ready'))
@@ -106,188 +166,168 @@ def display_status():
     </div>
     """, unsafe_allow_html=True)
 
-def extract_duration(text):
-    """Extract meeting duration from text"""
-    # Default to 60 minutes
-    duration = 60
-    
-    # Extract numbers
-    hours = re.search(r"(\d+)\s*hour", text.lower())
-    minutes = re.search(r"(\d+)\s*minute", text.lower())
-    
-    if hours and minutes:
-        duration = int(hours.group(1)) * 60 + int(minutes.group(1))
-    elif hours:
-        duration = int(hours.group(1)) * 60
-    elif minutes:
-        duration = int(minutes.group(1))
-    else:
-        # Look for any number
-        match = re.search(r"\d+", text)
-        if match:
-            num = int(match.group())
-            # If number is less than 10, assume hours, otherwise minutes
-            duration = num * 60 if num <= 5 else num
-    
-    return duration
+def speak(text, wait=False):
+    """Say text unless this session is text-only, where the chat already shows it."""
+    if not st.session_state.text_only:
+        synthesize_and_speak(text, wait=wait)
 
-def handle_meeting_flow(user_input):
-    """Handle the meeting creation flow step by step"""
-    
-    if st.session_state.meeting_step == 'none':
-        # Check if user wants to schedule a meeting
-        scheduled_time = parse_datetime_from_text(user_input)
-        if scheduled_time:
-            st.session_state.temp_meeting = {'datetime': scheduled_time}
-            st.session_state.meeting_step = 'title'
-            formatted = scheduled_time.strftime("%B %d, %Y at %I:%M %p")
-            response = f"I'll schedule a meeting for {formatted}. What should be the meeting title?"
-            add_message("assistant", response)
-            synthesize_and_speak(response)
-            return True
-    
-    elif st.session_state.meeting_step == 'title':
-        # Get meeting title
-        st.session_state.temp_meeting['title'] = user_input.strip()
-        st.session_state.meeting_step = 'duration'
-        response = "How long should the meeting be? You can say '1 hour', '30 minutes', etc."
-        add_message("assistant", response)
-        synthesize_and_speak(response)
-        return True
-    
-    elif st.session_state.meeting_step == 'duration':
-        # Get meeting duration
-        duration = extract_duration(user_input)
-        st.session_state.temp_meeting['duration'] = duration
-        st.session_state.meeting_step = 'confirm'
-        
-        # Show summary for confirmation
-        meeting = st.session_state.temp_meeting
-        formatted_time = meeting['datetime'].strftime("%B %d, %Y at %I:%M %p")
-        duration_text = f"{duration} minutes" if duration < 60 else f"{duration//60} hour{'s' if duration > 60 else ''}"
-        
-        response = f"Ready to create: '{meeting['title']}' on {formatted_time} for {duration_text}. Should I create it?"
-        add_message("assistant", response)
-        synthesize_and_speak(response)
-        return True
-    
-    elif st.session_state.meeting_step == 'confirm':
-        # Confirm and create meeting
-        if any(word in user_input.lower() for word in ["yes", "sure", "okay", "go ahead", "create"]):
-            create_meeting_now()
-        else:
-            st.session_state.meeting_step = 'none'
-            st.session_state.temp_meeting = {}
-            response = "Okay, I won't create the meeting. Anything else I can help with?"
-            add_message("assistant", response)
-            synthesize_and_speak(response)
-        return True
-    
-    return False
+def reply_to(text, context=None, wait=True):
+    if st.session_state.text_only:
+        return generate_response(text, context)
+    return respond_and_speak(text, wait=wait, context=context)
+
+def load_flow():
+    """This tab's booking dialogue, kept serialised in its session state.
+
+    Per browser session, not per user: anonymous visitors all share LOCAL_USER's
+    calendar, but never each other's half-built meeting.
+    """
+    return BookingFlow.from_dict(st.session_state.get('booking', {}), parse_datetime, extract=extract_booking)
 
-def create_meeting_now():
-    """Create the meeting with collected information"""
+def save_flow(flow):
+    st.session_state.booking = flow.to_dict()
+
+def say(text):
+    add_message("assistant", text)
+    speak(text)
+
+def run_flow(text, worker=None):
+    """Advance the shared booking flow; with a voice worker, LLM replies are left to it."""
+    add_message("user", text)
+    flow = load_flow()
+    handed_off = False
     try:
-        if not st.session_state.calendar_service:
-            st.session_state.calendar_service = authenticate_google_calendar()
-        
-        meeting = st.session_state.temp_meeting
-        link = create_meeting(
-            st.session_state.calendar_service,
-            meeting['datetime'].isoformat(),
-            meeting['duration'],
-            summary=meeting['title']
-        )
-        
-        success_msg = f"✅ Meeting '{meeting['title']}' created successfully!"
-        add_message("system", success_msg, link=link)
-        synthesize_and_speak("Your meeting has been created! The link is in the chat.")
-        
+        step = flow.handle(text)
+        if step.reply:
+            say(step.reply)
+
+        if step.action == 'create':
+            create_meeting_now(flow)
+        elif step.action == 'show_schedule':
+            lines = describe_events(list_events(calendar_service(), cache=user_session().events_cache()))
+            say(" ".join(lines) if lines else FLOW_PROMPTS['no_meetings'])
+        elif step.action == 'exit':
+            stop_voice()
+        elif step.action == 'chat':
+            if worker is not None:
+                # The reply reaches the flow's context when the worker posts it
+                worker.reply(text, context=flow.llm_context())
+                handed_off = True
+            else:
+                bot_reply = reply_to(text, context=flow.llm_context(), wait=False)
+                add_message("assistant", bot_reply)
+                flow.note_reply(bot_reply)
+    except PermissionError:
+        add_message("system", "📅 Connect your calendar first (sidebar).")
     except Exception as e:
-        error_msg = f"❌ Failed to create meeting: {str(e)[:50]}..."
-        add_message("system", error_msg)
-        synthesize_and_speak("Sorry, there was a problem creating the meeting.")
-    
-    # Reset meeting flow
-    st.session_state.meeting_step = 'none'
-    st.session_state.temp_meeting = {}
+        add_message("system", f"❌ Error: {str(e)[:50]}...")
+    finally:
+        save_flow(flow)
+        # A worker left without an answer would wait for one forever
+        if worker is not None and not handed_off:
+            worker.resume()
 
-def handle_voice_interaction():
-    """Main voice interaction handler"""
+def create_meeting_now(flow):
+    """Create the meeting the flow has collected"""
+    meeting = flow.meeting
     try:
-        # Listen for audio
-        st.session_state.current_step = 'listening'
-        audio_path = record_until_silence()
-        
-        if not audio_path:
-            st.session_state.current_step = 'ready'
-            return
-        
-        # Transcribe
-        st.session_state.current_step = 'processing'
-        user_text = transcribe_audio(audio_path)
-        
-        if not user_text:
-            st.session_state.current_step = 'ready'
-            return
-        
-        add_message("user", user_text)
-        
-        # Check for goodbye
-        if any(word in user_text.lower() for word in ["thank you", "thanks", "goodbye", "bye", "stop", "exit"]):
-            response = "Thank you! Have a wonderful day!"
-            add_message("assistant", response)
-            synthesize_and_speak(response)
-            st.session_state.is_active = False
-            st.session_state.current_step = 'ready'
-            return
-        
-        # Handle meeting flow
-        if handle_meeting_flow(user_text):
-            st.session_state.current_step = 'ready'
-            return
-        
-        # Generate normal response
-        bot_reply = generate_response(user_text)
-        add_message("assistant", bot_reply)
-        synthesize_and_speak(bot_reply)
-        
-        st.session_state.current_step = 'ready'
-        
+        link = create_meeting(
+            calendar_service(),
+            meeting['start'],
+            meeting['duration_minutes'],
+            summary=meeting['title'],
+            cache=user_session().events_cache(),
+            attendees=meeting.get('attendees')
+        )
+        if link:
+            add_message("system", f"✅ Meeting '{meeting['title']}' created successfully!", link=link)
+        step = flow.created(link)
     except Exception as e:
-        add_message("system", f"Error: {str(e)[:50]}...")
-        st.session_state.current_step = 'ready'
+        add_message("system", f"❌ Failed to create meeting: {str(e)[:50]}...")
+        step = flow.failed()
+    say(step.reply)
+
+def start_voice():
+    """Start this tab's voice worker; False when another tab holds the microphone."""
+    worker = VoiceWorker(
+        listen=lambda timeout: record_until_silence(timeout, on_speech=stop_speaking),
+        transcribe=transcribe_audio,
+        respond=respond_and_speak,
+        is_busy=is_speaking,
+        barge_in=BARGE_IN,
+        heartbeat_timeout=HEARTBEAT_TIMEOUT,
+        on_exit=lambda: release_microphone(worker)
+    )
+    if not get_voice_slot().acquire(worker):
+        return False
+    worker.start()
+    st.session_state.voice_worker = worker
+    st.session_state.is_active = True
+    st.session_state.current_step = 'ready'
+    return True
+
+def release_microphone(worker):
+    """Runs on the worker's thread once it stops; closes the mic unless another tab took over."""
+    if get_voice_slot().release(worker):
+        stop_listening()
+
+def stop_voice():
+    worker = st.session_state.voice_worker
+    if worker is not None:
+        # A stopped worker no longer holds the slot; it gives the microphone back as it exits
+        worker.stop()
+        st.session_state.voice_worker = None
+    st.session_state.is_active = False
+    st.session_state.current_step = 'ready'
+
+@st.fragment(run_every=POLL_INTERVAL)
+def voice_updates():
+    """Polls the voice worker, showing its status and applying what it heard."""
+    worker = st.session_state.voice_worker
+    if worker is None:
+        return
+
+    changed = False
+    for kind, value in worker.drain():
+        if kind == 'status':
+            st.session_state.current_step = value
+        elif kind == 'heard':
+            run_flow(value, worker)
+            changed = True
+        elif kind == 'reply':
+            add_message("assistant", value)
+            flow = load_flow()
+            flow.note_reply(value)
+            save_flow(flow)
+            changed = True
+        elif kind == 'error':
+            add_message("system", f"Error: {value[:50]}...")
+            changed = True
+
+    if not worker.running:
+        # Stopped by its heartbeat while this page was throttled, or by the slot's new owner
+        stop_voice()
+        changed = True
+
+    if changed:
+        # New messages live outside this fragment
+        st.rerun()
+    display_status()
 
 def process_text_input(text: str):
     """Process text input with same logic as voice"""
-    add_message("user", text)
-    
-    # Check goodbye
-    if any(word in text.lower() for word in ["thank you", "thanks", "goodbye", "bye", "stop", "exit"]):
-        response = "Thank you! Have a wonderful day!"
-        add_message("assistant", response)
-        threading.Thread(target=lambda: synthesize_and_speak(response), daemon=True).start()
-        return
-    
-    # Handle meeting flow
-    if handle_meeting_flow(text):
-        return
-    
-    # Generate normal response
-    bot_reply = generate_response(text)
-    add_message("assistant", bot_reply)
-    threading.Thread(target=lambda: synthesize_and_speak(bot_reply), daemon=True).start()
+    run_flow(text)
 
 def main():
     """Main application"""
     init_session_state()
     
     # Initialize calendar service
-    if st.session_state.calendar_service is None:
-        try:
-            st.session_state.calendar_service = authenticate_google_calendar()
-        except:
-            st.session_state.calendar_service = None
+    try:
+        calendar_service()
+        st.session_state.calendar_connected = True
+    except Exception:
+        st.session_state.calendar_connected = False
     
     # Header
     st.markdown("""
@@ -303,7 +343,7 @@ def main():
     with col1:
         # Status
         if st.session_state.is_active:
-            display_status()
+            voice_updates()
         
         # Conversation
         st.markdown("### 💬 Conversation")
@@ -323,27 +363,35 @@ def main():
         with col_clear:
             if st.button("🗑️ Clear"):
                 st.session_state.conversation_history = []
-                st.session_state.meeting_step = 'none'
-                st.session_state.temp_meeting = {}
+                st.session_state.pop('booking', None)
                 st.session_state.text_input_key += 1
                 st.rerun()
     
     with col2:
         st.markdown("### 🎛️ Controls")
         
+        st.session_state.text_only = st.checkbox(
+            "⌨️ Text only (no microphone or speech)",
+            value=st.session_state.text_only,
+            disabled=st.session_state.is_active
+        )
+
         # Voice controls
         if not st.session_state.is_active:
-            if st.button("🚀 Start Voice", use_container_width=True):
-                st.session_state.is_active = True
-                st.session_state.current_step = 'ready'
-                greeting = "Hello! I'm ready to help you schedule meetings!"
-                add_message("assistant", greeting)
-                threading.Thread(target=lambda: synthesize_and_speak(greeting), daemon=True).start()
+            if st.button("🚀 Start Voice", use_container_width=True, disabled=st.session_state.text_only):
+                # Shared across tabs: only the first voice session pays for these
+                get_transcription_server()
+                get_speech_backend()
+                prewarm_tts(FIXED_PHRASES)
+                if start_voice():
+                    add_message("assistant", GREETING)
+                    speak(GREETING)
+                else:
+                    add_message("system", "🎙️ Voice is already running in another tab; stop it there first.")
                 st.rerun()
         else:
             if st.button("⏹️ Stop Voice", use_container_width=True):
-                st.session_state.is_active = False
-                st.session_state.current_step = 'ready'
+                stop_voice()
                 add_message("system", "Voice session stopped")
                 st.rerun()
         
@@ -355,13 +403,17 @@ def main():
         else:
             st.info("⚪ Voice Inactive")
         
-        if st.session_state.meeting_step != 'none':
-            st.warning(f"📅 Meeting Step: {st.session_state.meeting_step}")
+        flow = load_flow()
+        if flow.state != 'idle':
+            st.warning(f"📅 Meeting Step: {flow.state}")
         
-        if st.session_state.calendar_service:
+        if st.session_state.calendar_connected:
             st.success("📅 Calendar Connected")
         else:
-            st.error("📅 Calendar Error")
+            st.error("📅 Calendar Not Connected")
+            if st.button("🔗 Connect calendar", use_container_width=True):
+                connect_calendar()
+                st.rerun()
         
         # Help
         st.markdown("### 💡 Help")
@@ -378,11 +430,6 @@ def main():
         4. ✅ Confirmation
         5. 🔗 Meeting created!
         """)
-    
-    # Voice interaction loop
-    if st.session_state.is_active and st.session_state.current_step == 'ready':
-        handle_voice_interaction()
-        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Set inside each worker process by _load_model
+_model = None
+
+def _load_model(model_size):
+    global _model
+    import whisper
+    print(f"🧠 Loading Whisper '{model_size}' model (pid {os.getpid()})...")
+    _model = whisper.load_model(model_size)
+
+def _transcribe(audio, options):
+    return _model.transcribe(audio, fp16=False, **options)
+
+class TranscriptionServer:
+    """Long-lived Whisper worker processes shared by every caller in this process.
+
+    Workers are spawned on the first request and each loads the model exactly
+    once; requests from concurrent sessions queue on the pool.
+    """
+
+    def __init__(self, model_size=None, workers=None):
+        self.model_size = model_size or os.getenv("WHISPER_MODEL", "base")
+        self.workers = workers or int(os.getenv("WHISPER_WORKERS", "1"))
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_load_model,
+                    initargs=(self.model_size,)
+                )
+        return self._pool
+
+    def warm_up(self):
+        """Start a worker now so the model is loaded before the first utterance."""
+        return self.start().submit(os.getpid)
+
+    def submit(self, audio, **options):
+        return self.start().submit(_transcribe, audio, options)
+
+    def transcribe(self, audio, **options):
+        return self.submit(audio, **options).result()["text"]
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_server():
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = TranscriptionServer()
+        return _server
+
+def transcribe(audio, **options):
+    return get_server().transcribe(audio, **options)
+
+class StreamingTranscriber:
+    """Transcribes the utterance in progress on a Listener while the user speaks.
+
+    Every interval seconds the audio after the committed prefix is decoded
+    and on_partial receives the running hypothesis. Segments ending more
+    than commit_margin seconds before the live edge are committed, so later
+    passes (and the final one after end-of-speech) only decode the tail,
+    prompted with the committed text.
+    """
+
+    def __init__(self, listener, server=None, interval=0.5, commit_margin=1.0, on_partial=None):
+        self.listener = listener
+        self.server = server or get_server()
+        self.interval = interval
+        self.commit_margin = commit_margin
+        self.on_partial = on_partial
+        self.committed_text = []
+        self.committed_samples = 0
+
+    def run(self, timeout=None):
+        """Block until the next utterance ends and return its final transcript, or None on timeout."""
+        self.listener.start()
+        waited = 0.0
+        pending = None
+        while True:
+            try:
+                utterance = self.listener.utterances.get(timeout=self.interval)
+                break
+            except queue.Empty:
+                pass
+
+            audio = self.listener.active_audio()
+            if audio is None:
+                waited += self.interval
+                if timeout is not None and waited >= timeout:
+                    return None
+                continue
+
+            if pending is not None:
+                if not pending[0].done():
+                    continue
+                self._apply(*pending)
+                pending = None
+            if len(audio) > self.committed_samples:
+                tail = audio[self.committed_samples:]
+                pending = (self._submit(tail), self.committed_samples, len(tail))
+
+        if pending is not None:
+            # Already running on the worker; its commits shrink the final pass
+            self._apply(*pending)
+        tail = utterance[self.committed_samples:]
+        final = self._submit(tail).result()
+        text = " ".join(self.committed_text + [final["text"].strip()]).strip()
+        self.committed_text = []
+        self.committed_samples = 0
+        return text
+
+    def _submit(self, audio):
+        return self.server.submit(audio, initial_prompt=" ".join(self.committed_text) or None)
+
+    def _apply(self, future, offset, length):
+        try:
+            result = future.result()
+        except Exception as e:
+            print("⚠️ Partial transcription failed:", e)
+            return
+
+        sample_rate = self.listener.sample_rate
+        horizon = length / sample_rate - self.commit_margin
+        segments = result.get("segments", [])
+        # Always leave the last segment open: its words may still change
+        for segment in segments[:-1]:
+            if segment["end"] > horizon:
+                break
+            self.committed_text.append(segment["text"].strip())
+            self.committed_samples = offset + int(segment["end"] * sample_rate)
+
+        if self.on_partial is not None:
+            open_segments = [
+                segment["text"].strip() for segment in segments
+                if offset + int(segment["end"] * sample_rate) > self.committed_samples
+            ]
+            self.on_partial(" ".join(self.committed_text + open_segments).strip())
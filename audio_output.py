@@ -0,0 +1,124 @@
+import io
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from tts_stream import PyAudioSink, stream_speech
+
+class PlaybackCancelled(Exception):
+    pass
+
+class _Job:
+    def __init__(self, kind, payload):
+        self.kind = kind
+        self.payload = payload
+        self.future = Future()
+        self.cancelled = threading.Event()
+
+class _CancellableSink:
+    def __init__(self, sink, job):
+        self.sink = sink
+        self.job = job
+
+    def write(self, pcm):
+        if self.job.cancelled.is_set():
+            raise PlaybackCancelled()
+        self.sink.write(pcm)
+
+class AudioOutput:
+    """Process-wide speaker: one thread plays queued clips and TTS streams in order.
+
+    The mixer and output streams are opened once and reused. play() and
+    speak() return Futures (or awaitables via the *_async variants), and
+    cancel() stops the current clip and drops the queue for barge-in.
+    """
+
+    def __init__(self, sink_factory=PyAudioSink, poll_interval=0.05):
+        self.sink_factory = sink_factory
+        self.poll_interval = poll_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._current = None
+        self._sinks = {}
+        self._mixer = None
+
+    def play(self, audio):
+        """Queue encoded audio (e.g. MP3 bytes)."""
+        return self._submit(_Job('encoded', audio))
+
+    def speak(self, text, backend):
+        """Queue text to be streamed from a TTS backend as it is synthesized."""
+        return self._submit(_Job('stream', (text, backend)))
+
+    async def play_async(self, audio):
+        return await asyncio.wrap_future(self.play(audio))
+
+    async def speak_async(self, text, backend):
+        return await asyncio.wrap_future(self.speak(text, backend))
+
+    def is_playing(self):
+        return self._current is not None or not self._queue.empty()
+
+    def cancel(self):
+        """Barge-in: stop what is playing and drop everything queued."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job.future.cancel()
+        current = self._current
+        if current is not None:
+            current.cancelled.set()
+
+    def _submit(self, job):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audio-output", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        return job.future
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            self._current = job
+            if not job.future.set_running_or_notify_cancel():
+                self._current = None
+                continue
+            try:
+                if job.kind == 'encoded':
+                    result = self._play_encoded(job)
+                else:
+                    result = self._play_stream(job)
+                job.future.set_result(result)
+            except PlaybackCancelled:
+                job.future.set_result(None)
+            except Exception as e:
+                job.future.set_exception(e)
+            finally:
+                self._current = None
+
+    def _play_encoded(self, job):
+        if self._mixer is None:
+            import pygame
+            pygame.mixer.init()
+            self._mixer = pygame.mixer
+
+        music = self._mixer.music
+        music.load(io.BytesIO(job.payload), "mp3")
+        music.play()
+        # Sleep between checks instead of spinning; wakes early on cancel
+        while music.get_busy():
+            if job.cancelled.wait(self.poll_interval):
+                music.stop()
+                raise PlaybackCancelled()
+
+    def _play_stream(self, job):
+        text, backend = job.payload
+        sink = self._sinks.get(backend.sample_rate)
+        if sink is None:
+            sink = self._sinks[backend.sample_rate] = self.sink_factory(backend.sample_rate)
+        return stream_speech(text, backend, _CancellableSink(sink, job))
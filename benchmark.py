@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+from datetime import datetime, timedelta
+
+from calendar_api import IST, BusyIntervals
+from tts_stream import FakeStreamBackend, NullSink, stream_speech
+from conversation_pipeline import FakeBackends
+from llm_engine import LLMClient
+from datetime_parser import DateTimeParser, DATEPARSER_SETTINGS
+
+WINDOW_DAYS = 30
+DURATION_MINUTES = 30
+BUFFER_MINUTES = 15
+
+def legacy_free_slots(busy_times, now, end, duration_minutes, buffer_minutes):
+    # The original O(slots x events) scan from get_free_slots, kept for comparison
+    free_slots = []
+    current = now + timedelta(minutes=buffer_minutes)
+    while current + timedelta(minutes=duration_minutes) <= end:
+        overlap = any(
+            start <= current < end_time or
+            start < current + timedelta(minutes=duration_minutes) <= end_time
+            for start, end_time in busy_times
+        )
+        if not overlap:
+            free_slots.append(current)
+        current += timedelta(minutes=30)
+    return free_slots
+
+def sweep_free_slots(busy_times, now, end, duration_minutes, buffer_minutes):
+    busy = BusyIntervals.from_intervals(busy_times)
+    return busy.free_slots(now + timedelta(minutes=buffer_minutes), end, duration_minutes)
+
+def tuple_list_bytes(busy_times):
+    return sys.getsizeof(busy_times) + sum(
+        sys.getsizeof(pair) + sys.getsizeof(pair[0]) + sys.getsizeof(pair[1]) for pair in busy_times
+    )
+
+def busy_intervals_bytes(busy):
+    return sys.getsizeof(busy.starts) + sys.getsizeof(busy.ends)
+
+def synthetic_calendar(n_events, now, days, seed=0):
+    rng = random.Random(seed)
+    window = days * 24 * 60
+    busy_times = []
+    for _ in range(n_events):
+        start = now + timedelta(minutes=rng.randrange(window))
+        busy_times.append((start, start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90, 120]))))
+    return busy_times
+
+def best_of(fn, repeat, *args):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def bench_free_slots():
+    now = datetime.now(IST).replace(second=0, microsecond=0)
+    end = now + timedelta(days=WINDOW_DAYS)
+
+    print(f"⏱️ get_free_slots: {WINDOW_DAYS}-day window, {DURATION_MINUTES}-minute slots")
+    print(f"{'events':>8} {'legacy (ms)':>12} {'sweep (ms)':>12} {'speedup':>9}")
+    for n_events in (10, 100, 1000, 10000):
+        busy_times = synthetic_calendar(n_events, now, WINDOW_DAYS)
+        args = (busy_times, now, end, DURATION_MINUTES, BUFFER_MINUTES)
+        legacy_time, _ = best_of(legacy_free_slots, 1 if n_events >= 1000 else 3, *args)
+        sweep_time, _ = best_of(sweep_free_slots, 5, *args)
+        print(f"{n_events:>8} {legacy_time * 1000:>12.2f} {sweep_time * 1000:>12.2f} {legacy_time / sweep_time:>8.1f}x")
+
+def bench_busy_intervals():
+    now = datetime.now(IST).replace(second=0, microsecond=0)
+    days = 90
+    calendars = [synthetic_calendar(200, now, days, seed=seed) for seed in range(20)]
+
+    t0 = time.perf_counter()
+    busy = BusyIntervals()
+    for busy_times in calendars:
+        busy = busy.union(BusyIntervals.from_intervals(busy_times))
+    build_time = time.perf_counter() - t0
+    query_time, slots = best_of(busy.free_slots, 5, now, now + timedelta(days=days), DURATION_MINUTES)
+
+    all_busy = [pair for busy_times in calendars for pair in busy_times]
+    print(f"⏱️ BusyIntervals: {len(calendars)} calendars x {days} days, {len(all_busy)} events")
+    print(f"  build + union: {build_time * 1000:.2f} ms, free-slot query: {query_time * 1000:.2f} ms ({len(slots)} slots)")
+    print(f"  memory: {tuple_list_bytes(all_busy) / 1024:.0f} KiB as datetime tuples, "
+          f"{busy_intervals_bytes(busy) / 1024:.0f} KiB as merged epoch-minute arrays")
+
+def bench_tts_stream():
+    backend = FakeStreamBackend()
+    print("⏱️ TTS playback latency with a fake stream (300 ms to first chunk)")
+    print(f"{'chars':>8} {'buffered (s)':>13} {'streaming (s)':>14}")
+    for text in ("Okay.", "What should be the meeting title?", "Sure! " * 40):
+        # The old path waits for the whole download before playing
+        t0 = time.perf_counter()
+        audio = b''.join(backend.stream(text))
+        buffered = time.perf_counter() - t0
+        metrics = stream_speech(text, backend, NullSink(backend.sample_rate, realtime=False))
+        print(f"{len(text):>8} {buffered:>13.2f} {metrics['time_to_first_audio']:>14.2f}")
+
+def bench_pipeline():
+    print("⏱️ Voice turn with fake backends (400 ms LLM)")
+    print(f"{'mode':>11} {'speech->first audio (s)':>24} {'turn (s)':>9}")
+    for pipelined in (False, True):
+        backends = FakeBackends(["book a meeting tomorrow at 3", "yes"])
+        _, _, trace = asyncio.run(backends.engine(pipelined=pipelined).run_turn())
+        mode = "pipelined" if pipelined else "sequential"
+        print(f"{mode:>11} {trace.between('heard', 'first_audio'):>24.2f} {trace.marks['spoken']:>9.2f}")
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Minimal chat-completions endpoint that counts TCP connections and fails every Nth request."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    requests = 0
+    fail_every = 0
+
+    def setup(self):
+        super().setup()
+        StubLLMHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        StubLLMHandler.requests += 1
+        if self.fail_every and StubLLMHandler.requests % self.fail_every == 0:
+            status, body = 429, b'{"error": "rate limited"}'
+        else:
+            status, body = 200, json.dumps({"choices": [{"message": {"content": "Sure."}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def bench_llm_client():
+    import requests
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    n_requests = 50
+
+    print(f"⏱️ {n_requests} LLM calls against a local stub server")
+    print(f"{'client':>16} {'connections':>12} {'total (ms)':>11}")
+
+    StubLLMHandler.connections = StubLLMHandler.requests = 0
+    t0 = time.perf_counter()
+    for _ in range(n_requests):
+        requests.post(url, json={"messages": []}, timeout=5).json()
+    print(f"{'requests.post':>16} {StubLLMHandler.connections:>12} {(time.perf_counter() - t0) * 1000:>11.1f}")
+
+    StubLLMHandler.connections = StubLLMHandler.requests = 0
+    StubLLMHandler.fail_every = 5
+    client = LLMClient(url=url, api_key="stub", backoff=0.001)
+    t0 = time.perf_counter()
+    for _ in range(n_requests):
+        client.complete("hi")
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(f"{'LLMClient':>16} {StubLLMHandler.connections:>12} {elapsed:>11.1f}  "
+          f"({StubLLMHandler.requests - n_requests} retried 429s)")
+
+    client.close()
+    server.shutdown()
+    StubLLMHandler.fail_every = 0
+
+DATETIME_PHRASES = [
+    "tomorrow at 3", "next Monday 10 AM", "friday at 4:30 pm", "book a meeting today at 5 pm",
+    "schedule it for the day after tomorrow at noon", "4th July, 2025 at 3:00 PM", "July 10 at 11 am",
+    "can we meet on wednesday at 2", "tonight at 8", "at 9:15 am", "in 2 hours",
+    "what's on my calendar", "project sync", "yes please", "an hour",
+]
+
+def bench_datetime_parser():
+    import dateparser
+
+    now = datetime.now(IST)
+    rounds = 20
+    print(f"⏱️ Datetime parsing: {len(DATETIME_PHRASES)} phrases x {rounds} rounds")
+
+    t0 = time.perf_counter()
+    dateparser.parse("tomorrow at 3", settings=DATEPARSER_SETTINGS)
+    print(f"  dateparser first call (loads language data): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for phrase in DATETIME_PHRASES:
+            dateparser.parse(phrase, settings=DATEPARSER_SETTINGS)
+    legacy = time.perf_counter() - t0
+
+    parser = DateTimeParser()
+    t0 = time.perf_counter()
+    for phrase in DATETIME_PHRASES:
+        parser.parse(phrase, now)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(rounds - 1):
+        for phrase in DATETIME_PHRASES:
+            parser.parse(phrase, now)
+    warm = time.perf_counter() - t0
+
+    calls = rounds * len(DATETIME_PHRASES)
+    print(f"{'parser':>16} {'per phrase (us)':>16}")
+    print(f"{'dateparser':>16} {legacy / calls * 1e6:>16.1f}")
+    print(f"{'first pass':>16} {cold / len(DATETIME_PHRASES) * 1e6:>16.1f}")
+    print(f"{'repeat pass':>16} {warm / (calls - len(DATETIME_PHRASES)) * 1e6:>16.1f}")
+    print(f"  {parser.stats()}")
+
+IMPORT_TARGETS = ['calendar_api', 'voice_agent', 'main', 'app']
+
+def import_time(module):
+    """Cold import in a fresh interpreter: (total ms, [(ms, direct dependency)]) from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+
+    total, direct = None, []
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        cumulative_ms, name = int(fields[1]) / 1000, fields[2].rstrip()
+        # Nesting is shown as two spaces per level after a single leading space
+        if name == f" {module}":
+            total = cumulative_ms
+            break
+        if not name.startswith("  "):
+            # Another top-level import (interpreter startup): its children are not ours
+            direct = []
+        elif name.startswith("   ") and not name.startswith("    "):
+            direct.append((cumulative_ms, name.strip()))
+    return total, sorted(direct, reverse=True)
+
+def bench_importtime():
+    print("⏱️ Cold-start import time (python -X importtime)")
+    for module in IMPORT_TARGETS:
+        try:
+            total, direct = import_time(module)
+        except ImportError as e:
+            print(f"{module:>14}: failed ({e})")
+            continue
+        slowest = ", ".join(f"{name} {ms:.0f}" for ms, name in direct[:4])
+        print(f"{module:>14}: {total:>8.1f} ms  (slowest: {slowest})")
+
+BENCHMARKS = {
+    'free_slots': bench_free_slots,
+    'busy_intervals': bench_busy_intervals,
+    'tts_stream': bench_tts_stream,
+    'pipeline': bench_pipeline,
+    'llm_client': bench_llm_client,
+    'datetime_parser': bench_datetime_parser,
+    'importtime': bench_importtime,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -0,0 +1,280 @@
+import re
+from datetime import datetime
+from collections import namedtuple
+
+import pytz
+from dateutil.parser import isoparse
+
+from intent_router import IntentRouter, parse_duration, mentions_duration, strip_duration
+
+IST = pytz.timezone("Asia/Kolkata")
+
+# Replies of the booking dialogue, shared by the CLI and the web app
+PROMPTS = {
+    'ask_title': "What should be the meeting title?",
+    'ask_duration': "How long should the meeting be? You can say things like '1 hour' or '30 minutes'.",
+    'ask_time_again': "I didn't catch the meeting time. Could you please say it again?",
+    'scheduled': "Your meeting has been scheduled. Here is the link.",
+    'calendar_error': "There was a problem creating the meeting.",
+    'not_scheduled': "Okay, I won’t schedule it yet.",
+    'no_meetings': "You have no upcoming meetings.",
+    'ending': "Okay, ending the session. Goodbye!",
+}
+
+# action tells the front end what to do besides saying reply:
+# None, 'chat' (ask the LLM for a reply), 'create', 'show_schedule' or 'exit'
+Step = namedtuple('Step', ['reply', 'action'])
+
+EXPECTING = {'title': 'title', 'duration': 'duration', 'confirm': 'confirm'}
+EMAIL = re.compile(r"[^@\s,;]+@[^@\s,;]+\.[a-z]{2,}", re.IGNORECASE)
+
+def estimate_tokens(text):
+    # About four characters per token for English; close enough for budgeting
+    return max(1, len(text) // 4)
+
+class ContextWindow:
+    """Rolling conversation memory that stays within a token budget.
+
+    Recent turns are kept verbatim; once they exceed max_tokens the oldest
+    are folded into a one-line-per-turn summary, which is itself trimmed to
+    summary_tokens by dropping its oldest lines.
+    """
+
+    def __init__(self, max_tokens=300, summary_tokens=100, max_turn_chars=160):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.max_turn_chars = max_turn_chars
+        self.summary = []
+        self.turns = []
+
+    def add(self, role, text):
+        self.turns.append((role, text))
+        while len(self.turns) > 1 and self._turn_tokens() > self.max_tokens:
+            role, text = self.turns.pop(0)
+            short = text if len(text) <= self.max_turn_chars else text[:self.max_turn_chars].rsplit(" ", 1)[0] + "…"
+            self.summary.append(f"{role} said: {short}")
+        while self.summary and estimate_tokens(" ".join(self.summary)) > self.summary_tokens:
+            self.summary.pop(0)
+
+    def render(self, skip_last=False):
+        lines = []
+        if self.summary:
+            lines.append("Earlier: " + " ".join(self.summary))
+        turns = self.turns[:-1] if skip_last else self.turns
+        lines.extend(f"{role.title()}: {text}" for role, text in turns)
+        return "\n".join(lines)
+
+    def tokens(self):
+        return estimate_tokens(self.render()) if self.summary or self.turns else 0
+
+    def clear(self):
+        self.summary = []
+        self.turns = []
+
+    def _turn_tokens(self):
+        return sum(estimate_tokens(f"{role}: {text}") for role, text in self.turns)
+
+    def to_dict(self):
+        return {'summary': list(self.summary), 'turns': [list(turn) for turn in self.turns]}
+
+    @classmethod
+    def from_dict(cls, data, **options):
+        window = cls(**options)
+        window.summary = list(data.get('summary', []))
+        window.turns = [tuple(turn) for turn in data.get('turns', [])]
+        return window
+
+def booking_start(booking):
+    """Start time from extract_booking's ISO string, in IST."""
+    if not booking or not booking.get('start'):
+        return None
+    try:
+        start = isoparse(booking['start'])
+    except ValueError:
+        return None
+    return IST.localize(start) if start.tzinfo is None else start.astimezone(IST)
+
+def describe_duration(minutes):
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours > 1 else ''}")
+    if minutes:
+        parts.append(f"{minutes} minutes")
+    return " and ".join(parts)
+
+def describe_events(events):
+    """One spoken line per upcoming event."""
+    lines = []
+    for event in events:
+        start = event['start'].get('dateTime', event['start'].get('date'))
+        time_obj = isoparse(start)
+        time_obj = IST.localize(time_obj) if time_obj.tzinfo is None else time_obj.astimezone(IST)
+        lines.append(f"{event.get('summary', 'No title')} on {time_obj.strftime('%d %B, %Y at %I:%M %p')}")
+    return lines
+
+class BookingFlow:
+    """The booking dialogue as a serialisable state machine, shared by main.py and app.py.
+
+    handle(text) advances the dialogue and returns a Step; the front end
+    speaks or shows step.reply and carries out step.action, reporting a
+    created meeting back through created(link) or failed(). States:
+    idle -> title -> duration -> confirm -> idle, skipping questions the
+    user already answered. parse_datetime(text) and extract(text, now,
+    context) are injected; extract only runs when the router can't resolve
+    the turn, and its reply answers small talk in the same call.
+    to_dict()/from_dict() round-trip through JSON.
+    """
+
+    def __init__(self, parse_datetime, extract=None, router=None, context=None):
+        self.parse_datetime = parse_datetime
+        self.extract = extract
+        self.router = router or IntentRouter(parse_datetime=parse_datetime)
+        self.context = context or ContextWindow()
+        self.state = 'idle'
+        self.meeting = {}
+
+    @property
+    def expecting(self):
+        """What the last question asked for, for the intent router and the voice front end."""
+        return EXPECTING.get(self.state)
+
+    @property
+    def start(self):
+        return isoparse(self.meeting['start']) if self.meeting.get('start') else None
+
+    def handle(self, text, now=None):
+        text = text.strip()
+        self.context.add('user', text)
+        intent = self.router.route(text, self.expecting)
+
+        if self.state == 'title':
+            # Taken as said: "Stop-gap review" is a title, not a request to stop
+            self.meeting['title'] = text.rstrip('.!?')
+            return self._next_question()
+        if intent.kind == 'exit':
+            self.reset()
+            return self._say(PROMPTS['ending'], 'exit')
+        if self.state == 'idle':
+            return self._handle_idle(text, intent, now or datetime.now(IST))
+        if self.state == 'duration':
+            duration = intent.value if intent.kind == 'duration' else parse_duration(text)
+            if not duration:
+                return self._say(PROMPTS['ask_duration'])
+            self.meeting['duration_minutes'] = duration
+            return self._next_question()
+
+        # confirm
+        if intent.kind == 'confirm':
+            return Step(None, 'create')
+        # "45 minutes" changes the length; as a datetime it would mean 45 minutes from now
+        changed = False
+        if mentions_duration(text):
+            self.meeting['duration_minutes'] = parse_duration(text)
+            changed = True
+            text = strip_duration(text)
+        # "No, make it Friday at 4" moves the meeting instead of dropping it
+        moved = intent.value if intent.kind == 'datetime' and not changed else self.parse_datetime(text)
+        if moved:
+            self.meeting['start'] = moved.isoformat()
+            changed = True
+        if changed:
+            return self._next_question()
+        self.reset()
+        return self._say(PROMPTS['not_scheduled'])
+
+    def note_reply(self, text):
+        """Record an LLM reply the front end produced for a 'chat' step."""
+        if text:
+            self.context.add('assistant', text)
+
+    def created(self, link):
+        self.reset()
+        return self._say(PROMPTS['scheduled'] if link else PROMPTS['calendar_error'])
+
+    def failed(self):
+        self.reset()
+        return self._say(PROMPTS['calendar_error'])
+
+    def reset(self):
+        self.state = 'idle'
+        self.meeting = {}
+
+    def llm_context(self):
+        """Bounded context for the LLM: the rolling window plus the booking in progress.
+
+        The utterance being answered is left out, since it goes as the prompt.
+        """
+        turns = self.context.turns
+        context = self.context.render(skip_last=bool(turns) and turns[-1][0] == 'user')
+        if self.meeting:
+            details = ", ".join(f"{key}={value}" for key, value in self.meeting.items())
+            context += f"\nBooking in progress: {details}"
+        return context
+
+    def to_dict(self):
+        return {'state': self.state, 'meeting': dict(self.meeting), 'context': self.context.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data, parse_datetime, extract=None, router=None):
+        flow = cls(parse_datetime, extract=extract, router=router,
+                   context=ContextWindow.from_dict(data.get('context', {})))
+        flow.state = data.get('state', 'idle')
+        flow.meeting = dict(data.get('meeting', {}))
+        return flow
+
+    def _handle_idle(self, text, intent, now):
+        if intent.kind == 'show_schedule':
+            return Step(None, 'show_schedule')
+        if intent.kind == 'datetime':
+            # The router already has the start, so this turn needs no model call
+            self.meeting = {'start': intent.value.isoformat()}
+            if mentions_duration(text):
+                self.meeting['duration_minutes'] = parse_duration(text)
+            attendees = [address.rstrip('.') for address in EMAIL.findall(text)]
+            if attendees:
+                self.meeting['attendees'] = attendees
+            return self._next_question()
+        if self.extract is None:
+            return Step(None, 'chat')
+
+        # One structured call captures time, title, length and attendees, or answers small talk
+        self.router.escalate(intent)
+        booking = self.extract(text, now, self.llm_context())
+        if booking is None:
+            return Step(None, 'chat')
+        if booking.get('intent') == 'exit':
+            return self._say(PROMPTS['ending'], 'exit')
+        if booking.get('intent') == 'show_schedule':
+            return Step(None, 'show_schedule')
+
+        start = booking_start(booking)
+        if start is None:
+            if booking.get('intent') == 'schedule':
+                return self._say(PROMPTS['ask_time_again'])
+            if booking.get('reply'):
+                return self._say(booking['reply'])
+            return Step(None, 'chat')
+
+        self.meeting = {'start': start.isoformat()}
+        for key in ('title', 'duration_minutes', 'attendees'):
+            if booking.get(key):
+                self.meeting[key] = booking[key]
+        return self._next_question()
+
+    def _next_question(self):
+        if not self.meeting.get('title'):
+            self.state = 'title'
+            return self._say(PROMPTS['ask_title'])
+        if not self.meeting.get('duration_minutes'):
+            self.state = 'duration'
+            return self._say(PROMPTS['ask_duration'])
+
+        self.state = 'confirm'
+        formatted = self.start.strftime("%d %B, %Y at %I:%M %p")
+        duration = describe_duration(self.meeting['duration_minutes'])
+        return self._say(f"Should I schedule '{self.meeting['title']}' on {formatted} for {duration}?")
+
+    def _say(self, reply, action=None):
+        self.context.add('assistant', reply)
+        return Step(reply, action)
@@ -1,100 +1,646 @@
 import os
+import json
+import time
+import random
+import sqlite3
+import heapq
+import threading
+import httplib2
 import pytz
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
 from dateutil.parser import isoparse
-from datetime import datetime, timedelta
-from googleapiclient.discovery import build
+from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.errors import HttpError
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
+TOKEN_PATH = 'token.json'
+CLIENT_SECRETS_PATH = 'credentials.json'
 IST = pytz.timezone("Asia/Kolkata")
 
+# Partial responses: only the event fields the scheduler actually reads
+EVENT_FIELDS = 'nextPageToken,items(id,status,summary,start,end)'
+SYNC_FIELDS = 'nextPageToken,nextSyncToken,items(id,status,summary,start,end)'
+MAX_PAGE_SIZE = 2500
+# Calendars per freebusy().query request allowed by the API
+FREEBUSY_MAX_CALENDARS = 50
+# Inserts per batch request recommended for the Calendar API
+BATCH_MAX_REQUESTS = 50
+
+CompactEvent = namedtuple('CompactEvent', ['id', 'summary', 'start', 'end'])
+
+class FreeBusyError(Exception):
+    """Some calendars could not be queried; errors maps each calendar id to the API's reasons."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"Free/busy unavailable for {', '.join(sorted(errors))}")
+
+# One token refresh at a time, and token.json is only ever written under this lock
+_token_lock = threading.Lock()
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+def _save_token(creds, token_path):
+    with open(token_path, 'w') as token:
+        token.write(creds.to_json())
+
+def load_credentials(token_path=TOKEN_PATH, client_secrets_path=CLIENT_SECRETS_PATH):
+    """OAuth credentials from token_path, refreshed and saved back when expired."""
+    with _token_lock:
+        creds = None
+        if os.path.exists(token_path):
+            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+        if creds and creds.valid:
+            return creds
+
+        if creds and creds.expired and creds.refresh_token:
+            print("🔑 Refreshing Google access token")
+            creds.refresh(Request())
+        else:
+            creds = run_oauth_flow(client_secrets_path)
+        _save_token(creds, token_path)
+        return creds
+
+def run_oauth_flow(client_secrets_path=CLIENT_SECRETS_PATH):
+    """Ask the user to grant calendar access in the browser; returns fresh credentials."""
+    flow = InstalledAppFlow.from_client_secrets_file(client_secrets_path, SCOPES)
+    return flow.run_local_server(port=0)
+
+def refresh_credentials(creds, token_path=TOKEN_PATH, save=None):
+    """Refresh shared credentials if they have expired; returns True when a refresh happened.
+
+    Services built on the same Credentials object see the new token at once,
+    and concurrent callers wait for a single refresh instead of racing. The
+    new token goes to token_path, or to save(creds) when given.
+    """
+    if creds.valid:
+        return False
+    with _token_lock:
+        if creds.valid:
+            return False
+        creds.refresh(Request())
+        if save is not None:
+            save(creds)
+        else:
+            _save_token(creds, token_path)
+        return True
+
+def get_discovery_document():
+    """Calendar v3 discovery document, loaded and parsed once per process."""
+    global _discovery_document
+    with _discovery_lock:
+        if _discovery_document is None:
+            from googleapiclient.discovery_cache import get_static_doc
+            document = get_static_doc('calendar', 'v3')
+            if document is not None:
+                _discovery_document = json.loads(document)
+        return _discovery_document
+
+def build_calendar_service(creds):
+    """A Calendar client for creds; cheap, since the discovery document is shared."""
+    document = get_discovery_document()
+    if document is None:
+        # Older googleapiclient releases don't bundle the document
+        return build('calendar', 'v3', credentials=creds)
+    return build_from_document(document, credentials=creds)
+
 def authenticate_google_calendar():
-    creds = None
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    else:
-        flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-    return build('calendar', 'v3', credentials=creds)
+    return build_calendar_service(load_credentials())
+
+def event_interval(event):
+    start, end = event['start'], event['end']
+    if 'dateTime' in start:
+        return isoparse(start['dateTime']), isoparse(end['dateTime'])
+    # All-day events only carry dates (end is exclusive), so block the whole local day(s)
+    return (
+        IST.localize(datetime.combine(date.fromisoformat(start['date']), datetime.min.time())),
+        IST.localize(datetime.combine(date.fromisoformat(end['date']), datetime.min.time())),
+    )
+
+def iter_events(service, time_min, time_max=None, fields=EVENT_FIELDS, calendar_id='primary', page_size=MAX_PAGE_SIZE):
+    """Lazily yield CompactEvents between time_min and time_max, one page at a time."""
+    page_token = None
+    while True:
+        result = service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min.isoformat(),
+            timeMax=time_max.isoformat() if time_max else None,
+            singleEvents=True,
+            orderBy='startTime',
+            maxResults=page_size,
+            pageToken=page_token,
+            fields=fields
+        ).execute()
+
+        for event in result.get('items', []):
+            start, end = event_interval(event)
+            yield CompactEvent(event['id'], event.get('summary', 'No title'), start, end)
+
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return
+
+def to_epoch_minutes(dt, round_up=False):
+    seconds = dt.timestamp()
+    return -int(-seconds // 60) if round_up else int(seconds // 60)
+
+def from_epoch_minutes(minutes):
+    return datetime.fromtimestamp(minutes * 60, IST)
+
+class BusyIntervals:
+    """Sorted, merged busy intervals stored as epoch minutes in two array('q') columns.
+
+    Overlap and gap queries bisect the start column, so a lookup touches only
+    the intervals inside the queried window.
+    """
 
-def get_free_slots(service, duration_minutes, days=7, buffer_minutes=15):
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, starts=None, ends=None):
+        self.starts = starts if starts is not None else array('q')
+        self.ends = ends if ends is not None else array('q')
+
+    @classmethod
+    def from_intervals(cls, intervals, buffer_minutes=0):
+        """Build from (start, end) datetimes, padding each side by buffer_minutes."""
+        return cls.from_minutes(sorted(
+            (to_epoch_minutes(start) - buffer_minutes, to_epoch_minutes(end, round_up=True) + buffer_minutes)
+            for start, end in intervals
+        ))
+
+    @classmethod
+    def from_minutes(cls, sorted_pairs):
+        """Build from (start, end) epoch-minute pairs already sorted by start."""
+        busy = cls()
+        starts, ends = busy.starts, busy.ends
+        for start, end in sorted_pairs:
+            if ends and start <= ends[-1]:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        return busy
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for start, end in zip(self.starts, self.ends):
+            yield from_epoch_minutes(start), from_epoch_minutes(end)
+
+    def union(self, *others):
+        return BusyIntervals.from_minutes(heapq.merge(
+            *(zip(busy.starts, busy.ends) for busy in (self,) + others)
+        ))
+
+    def overlaps(self, start, end):
+        start_m, end_m = to_epoch_minutes(start), to_epoch_minutes(end, round_up=True)
+        # Last interval starting before the query ends is the only candidate
+        i = bisect_left(self.starts, end_m) - 1
+        return i >= 0 and self.ends[i] > start_m
+
+    def free_gaps(self, window_start, window_end):
+        """Yield (start, end) epoch-minute gaps inside the window."""
+        cursor = to_epoch_minutes(window_start, round_up=True)
+        stop = to_epoch_minutes(window_end)
+        # Skip intervals that end before the window opens
+        i = max(bisect_right(self.starts, cursor) - 1, 0)
+        while cursor < stop:
+            if i < len(self.starts) and self.starts[i] < stop:
+                gap_end, busy_end = self.starts[i], self.ends[i]
+                i += 1
+            else:
+                gap_end, busy_end = stop, stop
+            if gap_end > cursor:
+                yield cursor, gap_end
+            cursor = max(cursor, busy_end)
+
+    def free_slots(self, window_start, window_end, duration_minutes, step_minutes=30):
+        """Slot starts that fit duration_minutes, on a step grid anchored at window_start."""
+        anchor = to_epoch_minutes(window_start, round_up=True)
+        slots = array('q')
+        for gap_start, gap_end in self.free_gaps(window_start, window_end):
+            # First grid point at or after the gap start
+            first = anchor + -((anchor - gap_start) // step_minutes) * step_minutes
+            slots.extend(range(first, gap_end - duration_minutes + 1, step_minutes))
+        # One tz conversion for the anchor, plain offsets for the rest
+        base = from_epoch_minutes(anchor)
+        return [base + timedelta(minutes=minutes - anchor) for minutes in slots]
+
+def get_free_slots(service, duration_minutes, days=7, buffer_minutes=15, step_minutes=30, cache=None):
     now = datetime.now(IST)
     end = now + timedelta(days=days)
 
-    events_result = service.events().list(
-        calendarId='primary',
-        timeMin=now.isoformat(),
-        timeMax=end.isoformat(),
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
+    if cache is not None:
+        intervals = cache.get_intervals(now, end)
+    else:
+        intervals = ((e.start, e.end) for e in iter_events(service, now, end))
 
-    events = events_result.get('items', [])
+    busy_times = BusyIntervals.from_intervals(intervals, buffer_minutes)
+    free_slots = busy_times.free_slots(
+        now + timedelta(minutes=buffer_minutes),
+        end,
+        duration_minutes,
+        step_minutes
+    )
 
-    busy_times = [
-        (isoparse(e['start']['dateTime']), isoparse(e['end']['dateTime']))
-        for e in events if 'dateTime' in e['start']
-    ]
+    return [slot.isoformat() for slot in free_slots]
 
-    free_slots = []
-    current = now + timedelta(minutes=buffer_minutes)
-    while current + timedelta(minutes=duration_minutes) <= end:
-        overlap = any(
-            start <= current < end_time or
-            start < current + timedelta(minutes=duration_minutes) <= end_time
-            for start, end_time in busy_times
+def _thread_http(service):
+    # httplib2 connections aren't thread-safe, so each concurrent request gets its own
+    credentials = getattr(getattr(service, '_http', None), 'credentials', None)
+    if credentials is None:
+        return None
+    return AuthorizedHttp(credentials, http=httplib2.Http())
+
+def _query_freebusy(service, calendar_ids, time_min, time_max, buffer_minutes):
+    body = {
+        'timeMin': time_min.isoformat(),
+        'timeMax': time_max.isoformat(),
+        'timeZone': 'Asia/Kolkata',
+        'items': [{'id': calendar_id} for calendar_id in calendar_ids]
+    }
+    result = service.freebusy().query(body=body).execute(http=_thread_http(service))
+
+    busy, errors = {}, {}
+    calendars = result.get('calendars', {})
+    for calendar_id in calendar_ids:
+        info = calendars.get(calendar_id)
+        if info is None or info.get('errors'):
+            errors[calendar_id] = info['errors'] if info else [{'reason': 'missing'}]
+            continue
+        busy[calendar_id] = BusyIntervals.from_intervals(
+            ((isoparse(b['start']), isoparse(b['end'])) for b in info.get('busy', [])),
+            buffer_minutes
         )
-        if not overlap:
-            free_slots.append(current.astimezone(IST).isoformat())
-        current += timedelta(minutes=30)
+    return busy, errors
 
-    return free_slots
+def get_busy_intervals(service, calendar_ids, time_min, time_max, buffer_minutes=0, max_workers=4, skip_errors=False):
+    """BusyIntervals per calendar, via concurrent freebusy queries of up to 50 calendars each.
 
-def create_meeting(service, start_time_str, duration_minutes, summary="Smart Scheduler Meeting"):
-    try:
-        start_time = isoparse(start_time_str)
-        if start_time.tzinfo is None:
-            start_time = IST.localize(start_time)
+    A calendar that can't be read (not found, no access) raises FreeBusyError,
+    since treating it as free would offer conflicting slots; with skip_errors
+    it is left out of the result instead.
+    """
+    calendar_ids = list(calendar_ids)
+    chunks = [
+        calendar_ids[i:i + FREEBUSY_MAX_CALENDARS]
+        for i in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS)
+    ]
+    if not chunks:
+        return {}
+
+    busy, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        futures = [
+            pool.submit(_query_freebusy, service, chunk, time_min, time_max, buffer_minutes)
+            for chunk in chunks
+        ]
+        for future in futures:
+            chunk_busy, chunk_errors = future.result()
+            busy.update(chunk_busy)
+            errors.update(chunk_errors)
+
+    if errors:
+        if not skip_errors:
+            raise FreeBusyError(errors)
+        for calendar_id, reasons in errors.items():
+            print(f"⚠️ Skipping calendar {calendar_id}:", reasons)
+    return busy
+
+def get_common_free_slots(service, calendar_ids, duration_minutes, days=7, buffer_minutes=15, step_minutes=30, max_workers=4,
+                          skip_errors=False):
+    """Free slots shared by every calendar, in the same format as get_free_slots.
+
+    Raises FreeBusyError when a calendar can't be read, unless skip_errors.
+    """
+    now = datetime.now(IST)
+    end = now + timedelta(days=days)
+
+    per_calendar = get_busy_intervals(service, calendar_ids, now, end, buffer_minutes, max_workers, skip_errors)
+    busy_times = BusyIntervals().union(*per_calendar.values())
+    free_slots = busy_times.free_slots(
+        now + timedelta(minutes=buffer_minutes),
+        end,
+        duration_minutes,
+        step_minutes
+    )
+
+    return [slot.isoformat() for slot in free_slots]
+
+class EventsCache:
+    """Local copy of a calendar's events, kept fresh with incremental syncToken syncs.
+
+    Reads within ttl_seconds of the last sync are served from memory. After that
+    the next read asks the API only for what changed since the stored sync token.
+    Pass db_path to persist the events and token in SQLite across restarts.
+    """
+
+    def __init__(self, service, calendar_id='primary', ttl_seconds=60, db_path=None):
+        self.service = service
+        self.calendar_id = calendar_id
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.events = {}
+        self.intervals = {}  # event id -> (start, end), parsed once when the event arrives
+        self.sync_token = None
+        self.synced_from = None
+        self.synced_at = None
+        self._by_start = None  # sorted (start, end, id), rebuilt after a sync changes anything
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self._lock = threading.Lock()
+        if db_path:
+            self._load()
+
+    def invalidate(self):
+        # Keep the sync token: the next read pulls just the changes
+        with self._lock:
+            self.synced_at = None
+
+    def get_events(self, time_min, time_max=None):
+        """Events overlapping [time_min, time_max), ordered by start."""
+        with self._lock:
+            return [self.events[event_id] for _, _, event_id in self._overlapping(time_min, time_max)]
+
+    def get_intervals(self, time_min, time_max=None):
+        """(start, end) of the same events, parsed once when they were fetched."""
+        with self._lock:
+            return [(start, end) for start, end, _ in self._overlapping(time_min, time_max)]
+
+    def _overlapping(self, time_min, time_max):
+        if self.synced_from is None or time_min < self.synced_from:
+            self.misses += 1
+            self._full_sync(time_min)
+        elif self.synced_at is None or time.monotonic() - self.synced_at > self.ttl_seconds:
+            self.misses += 1
+            self._incremental_sync()
         else:
-            start_time = start_time.astimezone(IST)
+            self.hits += 1
 
-        end_time = start_time + timedelta(minutes=duration_minutes)
+        if self._by_start is None:
+            self._by_start = sorted((start, end, event_id) for event_id, (start, end) in self.intervals.items())
+        stop = len(self._by_start) if time_max is None else bisect_left(self._by_start, (time_max,))
+        return [item for item in self._by_start[:stop] if item[1] > time_min]
 
-        print("📅 Scheduling at IST:", start_time.strftime("%d-%b-%Y %I:%M %p %Z"))
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'api_calls': self.api_calls,
+            'events': len(self.events),
+        }
+
+    def _full_sync(self, time_min):
+        # Start of the local day, so later reads from "now" stay inside the synced range
+        synced_from = time_min.astimezone(IST).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.events = {}
+        self.intervals = {}
+        self._by_start = None
+        self.sync_token = None
+        self._fetch(timeMin=synced_from.isoformat())
+        self.synced_from = synced_from
+        self._save(replace=True)
+
+    def _incremental_sync(self):
+        try:
+            changed = self._fetch(syncToken=self.sync_token)
+        except HttpError as e:
+            # 410 Gone: the sync token expired, start over
+            if e.resp.status != 410:
+                raise
+            self._full_sync(self.synced_from)
+            return
+        self._save(changed=changed)
+
+    def _fetch(self, **params):
+        changed = {}
+        page_token = None
+        while True:
+            result = self.service.events().list(
+                calendarId=self.calendar_id,
+                singleEvents=True,
+                maxResults=MAX_PAGE_SIZE,
+                pageToken=page_token,
+                fields=SYNC_FIELDS,
+                **params
+            ).execute()
+            self.api_calls += 1
+
+            for event in result.get('items', []):
+                changed[event['id']] = event
+                if event.get('status') == 'cancelled':
+                    self.events.pop(event['id'], None)
+                    self.intervals.pop(event['id'], None)
+                else:
+                    self.events[event['id']] = event
+                    self.intervals[event['id']] = event_interval(event)
+
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+
+        self.sync_token = result.get('nextSyncToken')
+        self.synced_at = time.monotonic()
+        if changed:
+            self._by_start = None
+        return changed
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, body TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return conn
 
-        event = {
-            'summary': summary,
-            'description': 'Scheduled by your voice assistant.',
-            'start': {
-                'dateTime': start_time.isoformat(),
-                'timeZone': 'Asia/Kolkata'
-            },
-            'end': {
-                'dateTime': end_time.isoformat(),
-                'timeZone': 'Asia/Kolkata'
-            },
-            'reminders': {
-                'useDefault': True
-            }
+    def _load(self):
+        conn = self._connect()
+        self.events = {
+            event_id: json.loads(body)
+            for event_id, body in conn.execute("SELECT id, body FROM events")
         }
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        conn.close()
+        if meta.get('calendar_id') != self.calendar_id or not meta.get('sync_token'):
+            self.events = {}
+            return
+        self.intervals = {event_id: event_interval(event) for event_id, event in self.events.items()}
+        self._by_start = None
+        self.sync_token = meta['sync_token']
+        self.synced_from = isoparse(meta['synced_from'])
 
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
+    def _save(self, changed=None, replace=False):
+        if not self.db_path:
+            return
+        conn = self._connect()
+        with conn:
+            if replace:
+                conn.execute("DELETE FROM events")
+                changed = self.events
+            for event_id, event in (changed or {}).items():
+                if event.get('status') == 'cancelled':
+                    conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO events (id, body) VALUES (?, ?)",
+                        (event_id, json.dumps(event))
+                    )
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ('calendar_id', self.calendar_id),
+                    ('sync_token', self.sync_token),
+                    ('synced_from', self.synced_from.isoformat() if self.synced_from else None),
+                ]
+            )
+        conn.close()
+
+def build_event(start_time_str, duration_minutes, summary="Smart Scheduler Meeting", attendees=None):
+    start_time = isoparse(start_time_str)
+    if start_time.tzinfo is None:
+        start_time = IST.localize(start_time)
+    else:
+        start_time = start_time.astimezone(IST)
+
+    end_time = start_time + timedelta(minutes=duration_minutes)
+
+    event = {
+        'summary': summary,
+        'description': 'Scheduled by your voice assistant.',
+        'start': {
+            'dateTime': start_time.isoformat(),
+            'timeZone': 'Asia/Kolkata'
+        },
+        'end': {
+            'dateTime': end_time.isoformat(),
+            'timeZone': 'Asia/Kolkata'
+        },
+        'reminders': {
+            'useDefault': True
+        }
+    }
+    if attendees:
+        event['attendees'] = [{'email': email} for email in attendees]
+    return event
+
+def create_meeting(service, start_time_str, duration_minutes, summary="Smart Scheduler Meeting", cache=None,
+                   attendees=None):
+    try:
+        event = build_event(start_time_str, duration_minutes, summary, attendees)
+
+        start_time = isoparse(event['start']['dateTime']).astimezone(IST)
+        print("📅 Scheduling at IST:", start_time.strftime("%d-%b-%Y %I:%M %p %Z"))
+
+        # Email invitations only go out when there is someone to invite
+        created_event = service.events().insert(
+            calendarId='primary',
+            body=event,
+            sendUpdates='all' if attendees else 'none'
+        ).execute()
+        if cache is not None:
+            cache.invalidate()
         print("✅ Event created:", created_event.get('htmlLink'))
         return created_event.get('htmlLink')
 
     except Exception as e:
         print("❌ Error creating event:", e)
         return None
-    
-def list_events(service, max_results=5):
+
+def _is_rate_limited(error):
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    # 403 is also used for permission errors; only retry rateLimitExceeded / userRateLimitExceeded
+    content = error.content.decode('utf-8', 'ignore') if isinstance(error.content, bytes) else str(error.content)
+    return error.resp.status == 403 and 'ratelimitexceeded' in content.lower()
+
+def create_meetings_batch(service, meetings, calendar_id='primary', max_retries=5, base_delay=1.0, cache=None):
+    """Insert many meetings with batched HTTP requests of up to 50 inserts each.
+
+    meetings is a list of dicts with start_time, duration_minutes and optional
+    summary and attendees. Returns one {'ok', 'link', 'error'} dict per meeting, in order. Items
+    rejected with 403/429 rate-limit errors are retried with exponential backoff.
+    """
+    results = [None] * len(meetings)
+    pending = {}
+    for index, meeting in enumerate(meetings):
+        try:
+            pending[index] = build_event(
+                meeting['start_time'],
+                meeting['duration_minutes'],
+                meeting.get('summary', "Smart Scheduler Meeting"),
+                meeting.get('attendees')
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            results[index] = {'ok': False, 'link': None, 'error': str(e)}
+
+    for attempt in range(max_retries + 1):
+        retry = {}
+
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            if exception is None:
+                results[index] = {'ok': True, 'link': response.get('htmlLink'), 'error': None}
+            else:
+                results[index] = {'ok': False, 'link': None, 'error': str(exception)}
+                if _is_rate_limited(exception):
+                    retry[index] = pending[index]
+
+        items = list(pending.items())
+        for i in range(0, len(items), BATCH_MAX_REQUESTS):
+            batch = service.new_batch_http_request(callback=callback)
+            for index, event in items[i:i + BATCH_MAX_REQUESTS]:
+                request = service.events().insert(
+                    calendarId=calendar_id,
+                    body=event,
+                    sendUpdates='all' if event.get('attendees') else 'none'
+                )
+                batch.add(request, request_id=str(index))
+            try:
+                batch.execute()
+            except Exception as e:
+                for index, _ in items[i:i + BATCH_MAX_REQUESTS]:
+                    if results[index] is None:
+                        results[index] = {'ok': False, 'link': None, 'error': str(e)}
+
+        if not retry or attempt == max_retries:
+            break
+        delay = base_delay * 2 ** attempt + random.uniform(0, base_delay)
+        print(f"⏳ Rate limited on {len(retry)} events, retrying in {delay:.1f}s...")
+        time.sleep(delay)
+        pending = retry
+
+    created = sum(1 for result in results if result['ok'])
+    if created and cache is not None:
+        cache.invalidate()
+    print(f"✅ Created {created}/{len(meetings)} events")
+    return results
+
+def list_events(service, max_results=5, cache=None):
+    now = datetime.now(IST)
+
+    if cache is not None:
+        return cache.get_events(now)[:max_results]
+
     events_result = service.events().list(
         calendarId='primary',
+        timeMin=now.isoformat(),
         maxResults=max_results,
         singleEvents=True,
-        orderBy='startTime'
+        orderBy='startTime',
+        fields=EVENT_FIELDS
     ).execute()
 
     return events_result.get('items', [])
@@ -0,0 +1,195 @@
+import re
+import time
+import asyncio
+import threading
+
+from llm_engine import iter_sentences
+
+NEGATIVE = re.compile(r"\b(no|nope|nah|wrong)\b", re.IGNORECASE)
+
+class TurnTrace:
+    """Seconds since the turn started at which each pipeline stage finished."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, stage):
+        self.marks.setdefault(stage, time.perf_counter() - self.start)
+
+    def between(self, first, last):
+        if first not in self.marks or last not in self.marks:
+            return None
+        return self.marks[last] - self.marks[first]
+
+    def summary(self):
+        return " | ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.marks.items())
+
+class ConversationEngine:
+    """Runs one listen -> confirm -> respond -> speak turn as overlapping asyncio tasks.
+
+    The LLM request starts as soon as the user's words are transcribed, so it
+    runs while the confirmation prompt plays and the answer is heard; a "no"
+    discards it. Replies are spoken sentence by sentence as they are
+    generated, with sentence N+1 prefetched while sentence N plays.
+
+    Every backend is a blocking callable run in a worker thread:
+    listen() -> text, respond(text) -> reply text or an iterator of reply
+    sentences, speak(text) plays a prompt, play(sentence) plays part of a
+    reply and prefetch(sentence) (optional) prepares it ahead of time.
+    pipelined=False runs the same stages strictly one after another, as a
+    baseline for latency comparisons.
+    """
+
+    def __init__(self, listen, respond, speak, play=None, prefetch=None, confirm=True, pipelined=True, router=None,
+                 speculate=True):
+        self.listen = listen
+        self.respond = respond
+        self.speak = speak
+        self.play = play or speak
+        self.prefetch = prefetch
+        self.confirm = confirm
+        self.pipelined = pipelined
+        self.router = router
+        self.speculate = speculate
+        self.traces = []
+
+    async def run_turn(self, expecting=None):
+        trace = TurnTrace()
+        self.traces.append(trace)
+
+        user_text = await asyncio.to_thread(self.listen)
+        trace.mark('heard')
+
+        local = False
+        if self.router is not None:
+            local = not self.router.needs_llm(self.router.route(user_text, expecting))
+            if local:
+                trace.mark('routed_locally')
+
+        reply = None
+        if self.pipelined and self.speculate and not local:
+            # Speculative: most confirmations are "yes"
+            reply = self._start_reply(user_text)
+
+        if self.confirm:
+            await asyncio.to_thread(self.speak, f"Did you say: {user_text}? Please say yes or no.")
+            trace.mark('confirm_prompt_played')
+            confirmation = await asyncio.to_thread(self.listen)
+            trace.mark('confirmed')
+
+            if NEGATIVE.search(confirmation):
+                if reply is not None:
+                    reply[1].set()
+                await asyncio.to_thread(self.speak, "Okay, please repeat your message.")
+                return await self.run_turn(expecting)
+
+        if local:
+            trace.mark('spoken')
+            return user_text, "", trace
+
+        if reply is None:
+            reply = self._start_reply(user_text)
+        bot_reply = await self._speak_reply(reply[0], trace)
+        trace.mark('spoken')
+
+        return user_text, bot_reply, trace
+
+    def _start_reply(self, user_text):
+        """Run the LLM in a thread, feeding sentences into an asyncio queue ended by None."""
+        loop = asyncio.get_running_loop()
+        sentences = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            reply = None
+            try:
+                reply = self.respond(user_text)
+                for sentence in iter_sentences([reply]) if isinstance(reply, str) else reply:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(sentences.put_nowait, sentence)
+            except Exception as e:
+                loop.call_soon_threadsafe(sentences.put_nowait, e)
+            finally:
+                if hasattr(reply, 'close'):
+                    # Releases the streaming HTTP response of a discarded reply
+                    reply.close()
+                loop.call_soon_threadsafe(sentences.put_nowait, None)
+
+        loop.run_in_executor(None, produce)
+        return sentences, stop
+
+    async def _next_sentence(self, sentences, trace):
+        sentence = await sentences.get()
+        if isinstance(sentence, Exception):
+            raise sentence
+        trace.mark('llm_done' if sentence is None else 'first_sentence')
+        return sentence
+
+    async def _speak_reply(self, sentences, trace):
+        if not self.pipelined:
+            spoken = []
+            while (sentence := await self._next_sentence(sentences, trace)) is not None:
+                spoken.append(sentence)
+            for sentence in spoken:
+                trace.mark('first_audio')
+                await asyncio.to_thread(self.play, sentence)
+            return " ".join(spoken)
+
+        spoken = []
+        sentence = await self._next_sentence(sentences, trace)
+        while sentence is not None:
+            spoken.append(sentence)
+            trace.mark('first_audio')
+            playing = asyncio.create_task(asyncio.to_thread(self.play, sentence))
+            following = await self._next_sentence(sentences, trace)
+            prefetching = None
+            if following is not None and self.prefetch is not None:
+                # Synthesize the next sentence while this one is still playing
+                prefetching = asyncio.create_task(asyncio.to_thread(self.prefetch, following))
+            await playing
+            if prefetching is not None:
+                await prefetching
+            sentence = following
+        return " ".join(spoken)
+
+class FakeBackends:
+    """Deterministic stand-ins with fixed delays, for latency regression checks."""
+
+    def __init__(self, utterances, listen_delay=0.05, llm_delay=0.4, synth_delay_per_char=0.004,
+                 play_delay_per_char=0.01, reply="Sure. I can book that for you. Which title should I use?"):
+        self.utterances = list(utterances)
+        self.listen_delay = listen_delay
+        self.llm_delay = llm_delay
+        self.synth_delay_per_char = synth_delay_per_char
+        self.play_delay_per_char = play_delay_per_char
+        self.reply = reply
+        self._prefetched = set()
+
+    def listen(self):
+        time.sleep(self.listen_delay)
+        return self.utterances.pop(0)
+
+    def respond(self, text):
+        # Streams like the LLM: the first sentence arrives after llm_delay, the rest shortly after
+        time.sleep(self.llm_delay)
+        for i, sentence in enumerate(iter_sentences([self.reply])):
+            if i:
+                time.sleep(self.llm_delay / 4)
+            yield sentence
+
+    def prefetch(self, sentence):
+        if sentence not in self._prefetched:
+            time.sleep(len(sentence) * self.synth_delay_per_char)
+            self._prefetched.add(sentence)
+
+    def play(self, sentence):
+        self.prefetch(sentence)
+        time.sleep(len(sentence) * self.play_delay_per_char)
+
+    def engine(self, pipelined=True):
+        return ConversationEngine(
+            self.listen, self.respond, self.play,
+            prefetch=self.prefetch, pipelined=pipelined
+        )
@@ -0,0 +1,199 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+
+IST = pytz.timezone("Asia/Kolkata")
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december']
+MONTH_NAMES = "|".join(MONTHS + [m[:3] for m in MONTHS] + ['sept'])
+
+DAY_WORD = re.compile(r"\b(day after tomorrow|today|tonight|tomorrow)\b")
+WEEKDAY = re.compile(r"\b(?:(next|this|coming)\s+)?(" + "|".join(WEEKDAYS) + r")\b")
+DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + MONTH_NAMES + r")\b\.?,?\s*(\d{4})?")
+MONTH_DAY = re.compile(r"\b(" + MONTH_NAMES + r")\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b,?\s*(\d{4})?")
+CLOCK_12H = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\b")
+CLOCK_24H = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+CLOCK_AT = re.compile(r"\bat\s+(\d{1,2})\b(?!\s*(?:minutes?|mins?|hours?|hrs?))")
+NAMED_TIME = re.compile(r"\b(noon|midday|midnight)\b")
+# Date forms the rules don't cover ("25/12", "2026-12-25", "the 25th", "next week", "in 3 days");
+# with one of these in the text, "no day mentioned" would be a wrong guess
+OTHER_DATE = re.compile(r"\d\s*[/-]\s*\d|\b\d{1,2}(?:st|nd|rd|th)\b|\b(?:days?|weeks?|weekend|months?|years?)\b")
+# Phrases measured from the current moment rather than the day, so never memoised
+RELATIVE_TO_NOW = re.compile(r"\b(now|ago|from now|later|in\s+(?:\d+|an?|half an?)\s+(?:minutes?|mins?|hours?|hrs?))\b")
+
+DATEPARSER_SETTINGS = {
+    'TIMEZONE': 'Asia/Kolkata',
+    'RETURN_AS_TIMEZONE_AWARE': True,
+    'PREFER_DATES_FROM': 'future'
+}
+
+_MISSING = object()
+
+class DateTimeParser:
+    """Turns spoken dates like "tomorrow at 3" or "next Monday 10 AM" into aware datetimes.
+
+    Common forms are handled by precompiled rules; anything else goes to
+    dateparser, imported on first use and limited to English. Rule results
+    and dateparser misses are memoised per (text, reference day); dateparser
+    hits depend on the time of day, so they are not.
+    """
+
+    def __init__(self, timezone=IST, max_entries=512):
+        self.timezone = timezone
+        self.max_entries = max_entries
+        self.hits = 0
+        self.fast_path = 0
+        self.dateparser_calls = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dateparser = None
+
+    def parse(self, text, now=None):
+        now = now.astimezone(self.timezone) if now else datetime.now(self.timezone)
+        text = " ".join(text.lower().split())
+        cacheable = not RELATIVE_TO_NOW.search(text)
+        key = (text, now.date())
+
+        if cacheable:
+            with self._lock:
+                result = self._entries.get(key, _MISSING)
+                if result is not _MISSING:
+                    self._entries.move_to_end(key)
+            # A time-only phrase cached earlier in the day may have rolled into the past
+            if result is not _MISSING and (result is None or result > now):
+                self.hits += 1
+                return result
+
+        result = self._fast_path(text, now)
+        if result is not None:
+            self.fast_path += 1
+        else:
+            result = self._parse_with_dateparser(text, now)
+            # dateparser fills in the current time of day ("an hour", "next monday"),
+            # so only its misses hold for the rest of the day
+            cacheable = cacheable and result is None
+
+        if cacheable:
+            with self._lock:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'fast_path': self.fast_path,
+            'dateparser_calls': self.dateparser_calls,
+            'entries': len(self._entries),
+        }
+
+    def _fast_path(self, text, now):
+        clock = self._clock(text)
+        if clock is None:
+            # A bare date gives nothing to book; let dateparser decide what it means
+            return None
+        hour, minute = clock
+
+        if hour < 12 and 'tonight' in text:
+            hour += 12
+
+        # A time that has already passed moves to the next matching day
+        parsed_day = self._day(text, now)
+        if parsed_day is None:
+            return None
+        day, roll_days = parsed_day
+        result = self.timezone.localize(datetime(day.year, day.month, day.day, hour, minute))
+        if roll_days and result <= now:
+            result += timedelta(days=roll_days)
+        return result
+
+    def _clock(self, text):
+        named = NAMED_TIME.search(text)
+        if named:
+            return (0, 0) if named.group(1) == 'midnight' else (12, 0)
+
+        match = CLOCK_12H.search(text)
+        if match:
+            hour, minute = int(match.group(1)), int(match.group(2) or 0)
+            if hour > 12:
+                return None
+            hour = hour % 12 + (12 if match.group(3) == 'p' else 0)
+        elif (match := CLOCK_24H.search(text)) or (match := CLOCK_AT.search(text)):
+            hour = int(match.group(1))
+            minute = int(match.group(2)) if match.re is CLOCK_24H else 0
+            # "at 3" or "2:30" with no am/pm: assume working hours, so 1-7 means the afternoon;
+            # a leading zero ("07:30") reads as a 24-hour time
+            if 1 <= hour <= 7 and not match.group(1).startswith('0'):
+                hour += 12
+        else:
+            return None
+        if hour > 23 or minute > 59:
+            return None
+        return hour, minute
+
+    def _day(self, text, now):
+        """(date, days to add if the time has passed) for the day mentioned in text, None if invalid."""
+        today = now.date()
+
+        word = DAY_WORD.search(text)
+        if word:
+            offset = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'day after tomorrow': 2}[word.group(1)]
+            return today + timedelta(days=offset), 0
+
+        weekday = WEEKDAY.search(text)
+        if weekday:
+            ahead = (WEEKDAYS.index(weekday.group(2)) - today.weekday()) % 7
+            if ahead == 0 and weekday.group(1) == 'next':
+                ahead = 7
+            return today + timedelta(days=ahead), 7
+
+        match = DAY_MONTH.search(text)
+        if match:
+            day, month, year = match.group(1), match.group(2), match.group(3)
+        else:
+            match = MONTH_DAY.search(text)
+            if match is None:
+                if OTHER_DATE.search(text):
+                    return None
+                return today, 1
+            month, day, year = match.group(1), match.group(2), match.group(3)
+
+        month = next(i for i, name in enumerate(MONTHS, 1) if name.startswith(month[:3]))
+        try:
+            date = today.replace(year=int(year) if year else today.year, month=month, day=int(day))
+        except ValueError:
+            return None
+        if not year and date < today:
+            date = date.replace(year=date.year + 1)
+        return date, 0
+
+    def _parse_with_dateparser(self, text, now):
+        if self._dateparser is None:
+            # Importing dateparser and loading its language data takes the better part of a second
+            import dateparser
+            self._dateparser = dateparser
+
+        self.dateparser_calls += 1
+        settings = dict(DATEPARSER_SETTINGS, RELATIVE_BASE=now.replace(tzinfo=None))
+        try:
+            return self._dateparser.parse(text, languages=['en'], settings=settings)
+        except (ValueError, OverflowError):
+            return None
+
+_parser = DateTimeParser()
+
+def parse_datetime(text, now=None):
+    """Aware datetime for the date and time mentioned in text, or None."""
+    if not text:
+        return None
+    result = _parser.parse(text, now)
+    if result is not None:
+        print(f"📅 Parsed datetime: {result}")
+    return result
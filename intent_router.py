@@ -0,0 +1,148 @@
+import re
+from collections import namedtuple
+
+Intent = namedtuple('Intent', ['kind', 'value'])
+
+# Intents the booking flow handles on its own, without an LLM round trip
+LOCAL_INTENTS = {'confirm', 'deny', 'duration', 'title', 'datetime', 'show_schedule', 'exit'}
+
+EXIT = re.compile(r"\b(stop|exit|quit|goodbye|bye)\b", re.IGNORECASE)
+SHOW_SCHEDULE = re.compile(
+    r"\bshow\b.*\b(schedule|meetings|calendar)\b|\bwhat(?:'s| is) on my (?:schedule|calendar)\b",
+    re.IGNORECASE
+)
+CONFIRM = re.compile(r"\b(yes|yeah|yep|sure|okay|ok|go ahead|correct|confirm|please do|create it)\b", re.IGNORECASE)
+DENY = re.compile(r"\b(no|nope|nah|don't|do not|cancel|wrong|not now)\b", re.IGNORECASE)
+# "Not sure", "I'm not okay with that": a negated confirm cue is a deny cue
+NEGATED_CONFIRM = re.compile(r"(?:\bnot|n't)\s+(?:really\s+|quite\s+|so\s+)?(?:sure|okay|ok|correct|yes)\b", re.IGNORECASE)
+HOURS = re.compile(r"\b(\d+(?:\.\d+)?|an?|one)\s*(?:hours?|hrs?)\b", re.IGNORECASE)
+MINUTES = re.compile(r"\b(\d+)\s*(?:minutes?|mins?)\b", re.IGNORECASE)
+HALF_HOUR = re.compile(r"\bhalf an? hour\b", re.IGNORECASE)
+NUMBER = re.compile(r"\d+")
+
+# Whisper usually writes small numbers as words
+NUMBER_WORDS = {
+    'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'fifteen': 15, 'twenty': 20, 'thirty': 30,
+    'forty five': 45, 'forty-five': 45, 'forty': 40, 'fifty': 50, 'sixty': 60, 'ninety': 90,
+}
+NUMBER_WORD = re.compile(r"\b(" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+# "an hour and a half", "one and a half hours", "2 and a half hours"
+AND_A_HALF = re.compile(
+    r"\b(\d+|an?|one)\s+(?:hours?|hrs?)\s+and\s+a\s+half\b|\b(\d+|an?|one)\s+and\s+a\s+half\s+(?:hours?|hrs?)\b",
+    re.IGNORECASE
+)
+# "in 2 hours" and "an hour from now" say when, not how long
+RELATIVE_TIME = re.compile(
+    r"\bin\s+(?:\d+(?:\.\d+)?|an?|half an?)\s+(?:hours?|hrs?|minutes?|mins?)\b"
+    r"|\b(?:\d+(?:\.\d+)?|an?)\s+(?:hours?|hrs?|minutes?|mins?)\s+from now\b",
+    re.IGNORECASE
+)
+
+def spoken_numbers(text):
+    """text with number words as digits and "and a half" folded in: "two and a half hours" -> "2.5 hours"."""
+    text = NUMBER_WORD.sub(lambda m: str(NUMBER_WORDS[m.group(1).lower()]), text)
+
+    def half(match):
+        amount = (match.group(1) or match.group(2)).lower()
+        return f"{(int(amount) if amount.isdigit() else 1) + 0.5:g} hours"
+    return AND_A_HALF.sub(half, text)
+
+def parse_duration(text, default=None):
+    """Meeting length in minutes from phrases like '1 hour 30 minutes', 'two hours' or 'half an hour'."""
+    text = spoken_numbers(text)
+    if HALF_HOUR.search(text):
+        return 30
+
+    hours = HOURS.search(text)
+    minutes = MINUTES.search(text)
+    if hours or minutes:
+        total = 0
+        if hours:
+            amount = hours.group(1).lower()
+            total += int(float(amount) * 60) if amount[0].isdigit() else 60
+        if minutes:
+            total += int(minutes.group(1))
+        return total
+
+    match = NUMBER.search(text)
+    return int(match.group()) if match else default
+
+def mentions_duration(text):
+    """True when text states a length such as '45 minutes' or 'an hour' (but not 'in an hour')."""
+    text = RELATIVE_TIME.sub(" ", spoken_numbers(text))
+    return bool(HALF_HOUR.search(text) or HOURS.search(text) or MINUTES.search(text))
+
+def strip_duration(text):
+    text = spoken_numbers(text)
+    return " ".join(MINUTES.sub(" ", HOURS.sub(" ", HALF_HOUR.sub(" ", text))).split())
+
+class IntentRouter:
+    """Classifies utterances with compiled rules so the LLM is only asked about free-form chat.
+
+    expecting tells the router what the flow just asked for ('confirm',
+    'title' or 'duration'), which settles otherwise ambiguous replies.
+    """
+
+    def __init__(self, parse_datetime=None):
+        self.parse_datetime = parse_datetime
+        self.turns = 0
+        self.local_turns = 0
+
+    def route(self, text, expecting=None):
+        intent = self._classify(text.strip(), expecting)
+        self.turns += 1
+        if intent.kind in LOCAL_INTENTS:
+            self.local_turns += 1
+        return intent
+
+    def needs_llm(self, intent):
+        return intent.kind not in LOCAL_INTENTS
+
+    def escalate(self, intent):
+        """Record that a turn classified as intent went to the LLM after all."""
+        if intent.kind in LOCAL_INTENTS:
+            self.local_turns -= 1
+
+    def stats(self):
+        return {
+            'turns': self.turns,
+            'local_turns': self.local_turns,
+            'local_ratio': self.local_turns / self.turns if self.turns else 0.0,
+        }
+
+    def _classify(self, text, expecting):
+        if EXIT.search(text):
+            return Intent('exit', None)
+        if SHOW_SCHEDULE.search(text):
+            return Intent('show_schedule', None)
+        if expecting == 'title':
+            return Intent('title', text.rstrip('.!?'))
+
+        # Same length, so cue positions still line up with text
+        cues = NEGATED_CONFIRM.sub(lambda m: "no".ljust(len(m.group())), text)
+        confirm, deny = CONFIRM.search(cues), DENY.search(cues)
+        # Outside a yes/no question, "No rush, but book..." is a request, not an answer
+        if (confirm or deny) and (expecting == 'confirm' or len(text.split()) <= 3):
+            # "Yes, no problem" confirms; "No, not okay" denies: the earliest cue wins
+            if deny and (not confirm or deny.start() < confirm.start()):
+                return Intent('deny', None)
+            return Intent('confirm', None)
+
+        if expecting == 'duration':
+            duration = parse_duration(text)
+            if duration:
+                return Intent('duration', duration)
+
+        # "two hours" is a length; date parsers would read it as two hours from now
+        has_duration = mentions_duration(text)
+        if self.parse_datetime is not None:
+            rest = strip_duration(text) if has_duration else text
+            scheduled_time = self.parse_datetime(rest) if rest else None
+            if scheduled_time:
+                return Intent('datetime', scheduled_time)
+
+        if has_duration:
+            return Intent('duration', parse_duration(text))
+
+        return Intent('chat', None)
@@ -1,50 +1,419 @@
 import os
+import re
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
 
-def generate_response(prompt):
-    headers = {
-        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
-        "Content-Type": "application/json"
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "google/gemini-2.5-flash-lite-preview-06-17"
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that schedules meetings using Google Calendar. "
+    "When the user provides time information, extract and reflect it clearly in your response. "
+    "Stick to natural and helpful language."
+)
+
+EXTRACT_PROMPT = (
+    "You extract meeting booking details from what the user said to a scheduling assistant. "
+    "It is now {now}; resolve relative dates and times against that. "
+    "Give start as a local ISO 8601 date-time such as 2025-07-04T15:00:00. "
+    "Use null for anything the user did not mention. "
+    "When the intent is chat, put a short, friendly spoken answer in reply."
+)
+
+BOOKING_INTENTS = ["schedule", "show_schedule", "exit", "chat"]
+
+# Function-calling schema for extract(); the model fills every field in one call
+BOOKING_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "record_booking",
+        "description": "Record what the user wants the meeting scheduler to do.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "intent": {"type": "string", "enum": BOOKING_INTENTS},
+                "start": {"type": ["string", "null"], "description": "Meeting start, local ISO 8601"},
+                "duration_minutes": {"type": ["integer", "null"]},
+                "title": {"type": ["string", "null"]},
+                "attendees": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Email addresses of the people to invite"
+                },
+                "reply": {"type": ["string", "null"], "description": "Answer to say back when intent is chat"}
+            },
+            "required": ["intent", "start", "duration_minutes", "title", "attendees", "reply"]
+        }
     }
+}
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+FALLBACK_REPLY = "Sorry, I'm having trouble reaching the language model right now. Please try again."
+
+# Statuses worth retrying: rate limiting and transient server failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    pass
+
+class LLMHTTPError(LLMError):
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+class LLMConnectionError(LLMError):
+    pass
+
+class LLMTimeoutError(LLMError):
+    pass
+
+class LLMEmptyResponseError(LLMError):
+    pass
+
+class ResponseCache:
+    """LRU + TTL cache of full LLM replies, keyed on normalised prompt, system prompt and model.
+
+    Pass db_path to also keep entries in SQLite so they survive restarts.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (created, reply), least recently used first
+        self._lock = threading.Lock()
+        if db_path:
+            self._load()
+
+    @staticmethod
+    def normalize(prompt):
+        return re.sub(r"[\s.!?,]+", " ", prompt.lower()).strip()
+
+    def key(self, prompt, system_prompt, model):
+        raw = "\x1f".join([self.normalize(prompt), system_prompt, model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._evict(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, reply):
+        created = time.time()
+        with self._lock:
+            self._entries[key] = (created, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+            if self.db_path:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, created, reply) VALUES (?, ?, ?)",
+                        (key, created, reply)
+                    )
+                conn.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def _evict(self, key):
+        self._entries.pop(key, None)
+        if self.db_path:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, reply TEXT)")
+        return conn
+
+    def _load(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+        rows = conn.execute(
+            "SELECT key, created, reply FROM responses ORDER BY created DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        conn.close()
+        for key, created, reply in reversed(rows):
+            self._entries[key] = (created, reply)
+
+class LLMClient:
+    """OpenRouter chat client over a keep-alive connection pool.
+
+    429 and 5xx responses, connection failures and timeouts are retried up to
+    max_retries times with exponential backoff plus jitter (honouring
+    Retry-After). Failures surface as LLMError subclasses.
+    """
+
+    def __init__(self, url=OPENROUTER_URL, model=MODEL, api_key=None, connect_timeout=5, read_timeout=30,
+                 max_retries=3, backoff=0.5, pool_size=4, cache=None):
+        self.url = url
+        self.cache = cache
+        self.model = model
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def complete(self, prompt, context=None):
+        key = self.cache.key(prompt, SYSTEM_PROMPT + (context or ""), self.model) if self.cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        reply = self._complete(prompt, context)
+        if key is not None:
+            self.cache.put(key, reply)
+        return reply
+
+    def stream(self, prompt, context=None):
+        """Yield the reply sentence by sentence while the model is still generating it."""
+        key = self.cache.key(prompt, SYSTEM_PROMPT + (context or ""), self.model) if self.cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield from iter_sentences([cached])
+                return
+
+        sentences = []
+        for sentence in self._stream(prompt, context):
+            sentences.append(sentence)
+            yield sentence
+        if key is not None:
+            self.cache.put(key, " ".join(sentences))
 
-    payload = {
-        "model": "google/gemini-2.5-flash-lite-preview-06-17",
-        "messages": [
+    def extract(self, prompt, now, context=None):
+        """Booking details as {intent, start, duration_minutes, title, attendees, reply} from one call.
+
+        now (an aware datetime) anchors relative phrases like "tomorrow at 3".
+        """
+        payload = self._payload(
+            prompt,
+            system_prompt=EXTRACT_PROMPT.format(now=now.strftime("%A %d %B %Y, %H:%M %Z")),
+            context=context
+        )
+        payload["tools"] = [BOOKING_TOOL]
+        payload["tool_choice"] = {"type": "function", "function": {"name": "record_booking"}}
+        payload["temperature"] = 0
+
+        message = self._message(self._post(payload))
+        calls = message.get("tool_calls") or []
+        # Models without tool support may answer with the JSON object as plain content
+        raw = calls[0]["function"]["arguments"] if calls else CODE_FENCE.sub("", (message.get("content") or "").strip())
+        if not raw:
+            raise LLMEmptyResponseError("The language model returned no booking details.")
+        try:
+            fields = json.loads(raw)
+        except ValueError as e:
+            raise LLMError(f"Invalid booking JSON from the language model: {e}") from e
+        if not isinstance(fields, dict):
+            raise LLMError("Booking details were not a JSON object.")
+        return _normalize_booking(fields)
+
+    def _complete(self, prompt, context=None):
+        return self._message(self._post(self._payload(prompt, context=context)))["content"]
+
+    def _message(self, response):
+        try:
+            json_resp = response.json()
+        except ValueError as e:
+            raise LLMError(f"Invalid JSON from the language model: {e}") from e
+        if not json_resp.get("choices"):
+            raise LLMEmptyResponseError("The language model returned no choices.")
+        return json_resp["choices"][0]["message"]
+
+    def _stream(self, prompt, context=None):
+        with self._post(self._payload(prompt, stream=True, context=context), stream=True) as response:
+            response.encoding = "utf-8"
+            try:
+                yield from iter_sentences(_iter_deltas(response))
+            except requests.exceptions.RequestException as e:
+                # Mid-stream failures can't be retried without repeating spoken sentences
+                raise LLMConnectionError(str(e)) from e
+            except ValueError as e:
+                raise LLMError(f"Malformed stream event: {e}") from e
+
+    def close(self):
+        self.session.close()
+
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key or os.getenv('OPENROUTER_API_KEY')}",
+            "Content-Type": "application/json"
+        }
+
+    def _payload(self, prompt, stream=False, system_prompt=SYSTEM_PROMPT, context=None):
+        messages = [
             {
                 "role": "system",
-                "content": (
-                    "You are a helpful assistant that schedules meetings using Google Calendar. "
-                    "When the user provides time information, extract and reflect it clearly in your response. "
-                    "Stick to natural and helpful language."
-                )
-            },
-            {
-                "role": "user",
-                "content": prompt
+                "content": system_prompt
             }
         ]
+        if context:
+            # Already bounded by the caller (see booking_flow.ContextWindow)
+            messages.append({
+                "role": "system",
+                "content": f"Conversation so far:\n{context}"
+            })
+        messages.append({
+            "role": "user",
+            "content": prompt
+        })
+        payload = {
+            "model": self.model,
+            "messages": messages
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _post(self, payload, stream=False):
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.post(
+                    self.url,
+                    json=payload,
+                    headers=self._headers(),
+                    timeout=self.timeout,
+                    stream=stream
+                )
+            except requests.exceptions.Timeout as e:
+                if last_attempt:
+                    raise LLMTimeoutError(str(e)) from e
+                self._sleep(attempt)
+                continue
+            except requests.exceptions.ConnectionError as e:
+                if last_attempt:
+                    raise LLMConnectionError(str(e)) from e
+                self._sleep(attempt)
+                continue
+
+            if response.ok:
+                return response
+
+            body = response.text
+            response.close()
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                raise LLMHTTPError(response.status_code, body)
+            self._sleep(attempt, response.headers.get("Retry-After"))
+
+    def _sleep(self, attempt, retry_after=None):
+        delay = self.backoff * 2 ** attempt
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        time.sleep(delay + random.uniform(0, self.backoff))
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(cache=ResponseCache(db_path=os.getenv("LLM_CACHE_DB")))
+        return _client
+
+def generate_response(prompt, context=None):
+    try:
+        return get_client().complete(prompt, context)
+    except LLMError as e:
+        print("❌ LLM error:", e)
+        return FALLBACK_REPLY
+
+def extract_booking(prompt, now, context=None):
+    """Structured booking details for prompt, or None when the LLM can't be reached."""
+    try:
+        return get_client().extract(prompt, now, context)
+    except LLMError as e:
+        print("❌ LLM error:", e)
+        return None
+
+def _normalize_booking(fields):
+    # Models occasionally return strings for numbers, empty strings for null or names for emails
+    try:
+        duration = int(fields.get("duration_minutes") or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    attendees = fields.get("attendees") or []
+    if isinstance(attendees, str):
+        attendees = attendees.split(",")
+    return {
+        "intent": fields.get("intent") if fields.get("intent") in BOOKING_INTENTS else "chat",
+        "start": fields.get("start") or None,
+        "duration_minutes": duration if duration > 0 else None,
+        "title": str(fields.get("title") or "").strip() or None,
+        "attendees": [a.strip() for a in attendees if isinstance(a, str) and EMAIL.match(a.strip())],
+        "reply": str(fields.get("reply") or "").strip() or None,
     }
 
+def iter_sentences(deltas):
+    """Regroup streamed text fragments into whole sentences."""
+    buffer = ""
+    for delta in deltas:
+        buffer += delta
+        *sentences, buffer = SENTENCE_END.split(buffer)
+        for sentence in sentences:
+            if sentence.strip():
+                yield sentence.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+def _iter_deltas(response):
+    # Server-sent events: "data: {...}" lines, ": comment" keep-alives, "data: [DONE]" at the end
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data: "):
+            continue
+        data = line[len("data: "):]
+        if data == "[DONE]":
+            return
+        chunk = json.loads(data)
+        if chunk.get("choices"):
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+def stream_response(prompt, context=None):
+    """Yield the reply sentence by sentence while the model is still generating it."""
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            json=payload,
-            headers=headers,
-            timeout=15
-        )
-        response.raise_for_status()
-        json_resp = response.json()
-
-        if "choices" in json_resp and json_resp["choices"]:
-            return json_resp["choices"][0]["message"]["content"]
-        else:
-            return "Sorry, I received an empty response from the language model."
-
-    except requests.exceptions.HTTPError as http_err:
-        return f"HTTP error occurred: {http_err}\nDetails: {response.text}"
-    except requests.exceptions.ConnectionError:
-        return "Connection error: Please check your internet connection."
-    except requests.exceptions.Timeout:
-        return "Request timed out. Please try again."
-    except Exception as e:
-        return f"Unexpected error: {str(e)}"
+        yield from get_client().stream(prompt, context)
+    except LLMError as e:
+        print("❌ LLM error:", e)
+        yield FALLBACK_REPLY
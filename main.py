@@ -1,168 +1,100 @@
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
 
-import re
-import pytz
-import dateparser
-from datetime import datetime
-from dateutil.parser import isoparse
+import sys
 from dotenv import load_dotenv
 
-from voice_agent import run_voice_agent, synthesize_speech, play_audio
-from llm_engine import generate_response
-from calendar_api import authenticate_google_calendar, get_free_slots, create_meeting
+from voice_agent import run_voice_agent, synthesize_and_speak, prewarm_tts, set_text_only
+from llm_engine import extract_booking, stream_response
+from datetime_parser import parse_datetime
+from booking_flow import BookingFlow, describe_events, PROMPTS as FLOW_PROMPTS
+from calendar_api import authenticate_google_calendar, create_meeting, EventsCache
+from calendar_api import list_events as upcoming_events
 
 # Load environment variables
 load_dotenv()
 
-IST = pytz.timezone("Asia/Kolkata")
+# Prompts of this front end; the booking dialogue's own are in booking_flow.PROMPTS
+PROMPTS = {
+    'greeting': "Hi! I’m your Smart Scheduler assistant. How can I help you today?",
+    'listening': "I'm listening...",
+    'not_understood': "Sorry, I couldn't understand. Please try again.",
+    'goodbye': "Goodbye! Have a great day!",
+}
 
-def parse_datetime_from_text(text):
-    full_pattern = r"(\d{1,2}(?:st|nd|rd|th)?\s+\w+,\s*\d{4}).*?(\d{1,2}:\d{2}\s*(?:AM|PM|am|pm))"
-    match = re.search(full_pattern, text)
-    if match:
-        date_str = match.group(1)
-        time_str = match.group(2)
-        full_str = f"{date_str} {time_str}"
-        print(f"📅 Extracted datetime string: {full_str}")
-        parsed = dateparser.parse(
-            full_str,
-            settings={
-                'TIMEZONE': 'Asia/Kolkata',
-                'RETURN_AS_TIMEZONE_AWARE': True,
-                'PREFER_DATES_FROM': 'future'
-            }
-        )
-        return parsed
-
-    general_parsed = dateparser.parse(
-        text,
-        settings={
-            'TIMEZONE': 'Asia/Kolkata',
-            'RETURN_AS_TIMEZONE_AWARE': True,
-            'PREFER_DATES_FROM': 'future'
-        }
-    )
-    if general_parsed:
-        print(f"📅 General parsed datetime: {general_parsed}")
-        return general_parsed
-
-    return None
-
-def list_events(service):
+def list_events(service, cache=None):
     print("\n📆 Your upcoming meetings:")
-    events_result = service.events().list(
-        calendarId='primary',
-        maxResults=5,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-
-    events = events_result.get('items', [])
-
-    if not events:
+    lines = describe_events(upcoming_events(service, max_results=5, cache=cache))
+    if not lines:
         print("No upcoming events found.")
-        synthesize_and_speak("You have no upcoming meetings.")
-        return
-
-    for event in events:
-        start = event['start'].get('dateTime', event['start'].get('date'))
-        summary = event.get('summary', 'No title')
-        time_obj = isoparse(start).astimezone(IST)
-        formatted_time = time_obj.strftime("%d %B, %Y at %I:%M %p")
-        synthesize_and_speak(f"{summary} on {formatted_time}")
-        print(f"{summary} on {formatted_time}")
-
-def synthesize_and_speak(text):
-    audio_file = synthesize_speech(text)
-    play_audio(audio_file)
+        return [FLOW_PROMPTS['no_meetings']]
+    for line in lines:
+        print(line)
+    return lines
 
 def main():
-    synthesize_and_speak("Hi! I’m your Smart Scheduler assistant. How can I help you today?")
+    prewarm_tts(list(PROMPTS.values()) + list(FLOW_PROMPTS.values()))
+    synthesize_and_speak(PROMPTS['greeting'])
 
     calendar_service = authenticate_google_calendar()
-    conversation_context = ""
-
-    while True:
-        synthesize_and_speak("I'm listening...")
+    events_cache = EventsCache(calendar_service)
+    flow = BookingFlow(parse_datetime, extract=extract_booking)
+    ended = []
+
+    def respond(text):
+        """Advance the booking flow with what the user said; yields what to say back."""
+        step = flow.handle(text)
+        if step.reply:
+            yield step.reply
+
+        if step.action == 'chat':
+            sentences = []
+            for sentence in stream_response(text, flow.llm_context()):
+                sentences.append(sentence)
+                yield sentence
+            flow.note_reply(" ".join(sentences))
+        elif step.action == 'show_schedule':
+            yield from list_events(calendar_service, cache=events_cache)
+        elif step.action == 'create':
+            meeting = flow.meeting
+            print(f"🕒 Final meeting duration: {meeting['duration_minutes']} minutes")
+            link = create_meeting(
+                calendar_service,
+                meeting['start'],
+                meeting['duration_minutes'],
+                summary=meeting['title'],
+                cache=events_cache,
+                attendees=meeting.get('attendees')
+            )
+            print("📅 Meeting link:", link)
+            yield flow.created(link).reply
+        elif step.action == 'exit':
+            ended.append(True)
+
+    while not ended:
+        synthesize_and_speak(PROMPTS['listening'])
         try:
-            user_input, bot_reply = run_voice_agent()
+            # The flow must not advance on a mishearing, so nothing runs before the user confirms
+            user_input, _ = run_voice_agent(respond=respond, speculate=False)
         except Exception as e:
             print("❌ Voice Agent Error:", e)
-            synthesize_and_speak("Sorry, I couldn't understand. Please try again.")
+            synthesize_and_speak(PROMPTS['not_understood'])
             continue
 
         print("User:", user_input)
-
-        if "stop" in user_input.lower() or "exit" in user_input.lower():
-            synthesize_and_speak("Okay, ending the session. Goodbye!")
-            break
-
-        if "show" in user_input.lower() and "schedule" in user_input.lower():
-            list_events(calendar_service)
-            continue
-
-        conversation_context += f"\nUser: {user_input}\nAssistant: {bot_reply}"
-
-        scheduled_time = parse_datetime_from_text(user_input) or parse_datetime_from_text(bot_reply)
-
-        if scheduled_time:
-            formatted = scheduled_time.strftime("%d %B, %Y at %I:%M %p")
-            synthesize_and_speak(f"Should I schedule the meeting on {formatted}?")
-            confirm_input, _ = run_voice_agent()
-
-            if any(word in confirm_input.lower() for word in ["yes", "sure", "okay", "go ahead"]):
-                synthesize_and_speak("What should be the meeting title?")
-                title, _ = run_voice_agent()
-
-                synthesize_and_speak("How long should the meeting be? You can say things like '1 hour' or '30 minutes'.")
-                duration_input, _ = run_voice_agent()
-                print("⏱️ Duration input:", duration_input)
-
-                # Default
-                duration = 60
-
-                # Extract numbers
-                hours = re.search(r"(\d+)\s*hour", duration_input)
-                minutes = re.search(r"(\d+)\s*minute", duration_input)
-
-                if hours and minutes:
-                    duration = int(hours.group(1)) * 60 + int(minutes.group(1))
-                elif hours:
-                    duration = int(hours.group(1)) * 60
-                elif minutes:
-                    duration = int(minutes.group(1))
-                else:
-                    match = re.search(r"\d+", duration_input)
-                    duration = int(match.group()) if match else 60
-
-                print(f"🕒 Final meeting duration: {duration} minutes")
-
-                try:
-                    link = create_meeting(
-                        calendar_service,
-                        scheduled_time.isoformat(),
-                        duration,
-                        summary=title
-                    )
-                    synthesize_and_speak("Your meeting has been scheduled. Here is the link.")
-                    print("📅 Meeting link:", link)
-                    conversation_context = ""
-                except Exception as e:
-                    print("❌ Calendar error:", e)
-                    synthesize_and_speak("There was a problem creating the meeting.")
-            else:
-                synthesize_and_speak("Okay, I won’t schedule it yet.")
-                conversation_context = ""
-        else:
-            synthesize_and_speak("I didn't catch the meeting time. Could you please say it again?")
+        stats = flow.router.stats()
+        print(f"🧭 Served locally: {stats['local_turns']}/{stats['turns']} turns ({stats['local_ratio']:.0%}), "
+              f"context ~{flow.context.tokens()} tokens")
 
 if __name__ == "__main__":
+    # python main.py --text: type instead of speaking, replies are printed
+    if "--text" in sys.argv[1:]:
+        set_text_only()
     try:
         print("✅ Starting Smart Scheduler")
         main()
     except KeyboardInterrupt:
         print("\n👋 Goodbye! Exiting the Smart Scheduler.")
-        synthesize_and_speak("Goodbye! Have a great day!")
+        synthesize_and_speak(PROMPTS['goodbye'])
     except Exception as e:
         print("❌ Error occurred in main:", e)
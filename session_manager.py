@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from cryptography.fernet import Fernet, InvalidToken
+from google.oauth2.credentials import Credentials
+
+from calendar_api import SCOPES, TOKEN_PATH, CLIENT_SECRETS_PATH, EventsCache, build_calendar_service, refresh_credentials, run_oauth_flow
+
+# Identity used when nobody is signed in; it shares token.json with the CLI
+LOCAL_USER = 'local'
+
+class TokenStore:
+    """Per-user OAuth tokens, encrypted at rest with Fernet.
+
+    The key comes from TOKEN_STORE_KEY; without it one is generated on first
+    use and kept next to the tokens (readable by the owner only). Files are
+    named by a hash of the user id, so the directory listing reveals no one.
+    """
+
+    def __init__(self, directory=None, key=None):
+        self.directory = directory or os.getenv("TOKEN_STORE_DIR", ".tokens")
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._fernet = Fernet(key or os.getenv("TOKEN_STORE_KEY") or self._local_key())
+        self._lock = threading.Lock()
+
+    def load(self, user_id):
+        try:
+            with open(self._path(user_id), "rb") as f:
+                token = self._fernet.decrypt(f.read())
+        except FileNotFoundError:
+            return None
+        except InvalidToken:
+            print(f"⚠️ Stored token for {user_id} can't be decrypted with the current key; ignoring it")
+            return None
+        return Credentials.from_authorized_user_info(json.loads(token), SCOPES)
+
+    def save(self, user_id, creds):
+        data = self._fernet.encrypt(creds.to_json().encode("utf-8"))
+        path = self._path(user_id)
+        with self._lock:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def delete(self, user_id):
+        try:
+            os.remove(self._path(user_id))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, user_id):
+        return os.path.join(self.directory, hashlib.sha256(user_id.encode("utf-8")).hexdigest() + ".token")
+
+    def _local_key(self):
+        path = os.path.join(self.directory, ".key")
+        if not os.path.exists(path):
+            print("🔑 TOKEN_STORE_KEY not set; generating a local token store key")
+            with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+                f.write(Fernet.generate_key())
+        with open(path, "rb") as f:
+            return f.read()
+
+class UserSession:
+    """Everything held for one user: credentials, Calendar client, caches and conversation state.
+
+    With token_path set, credentials are read from and saved to that plain
+    token file (as the CLI does) instead of the encrypted store.
+    """
+
+    def __init__(self, user_id, token_store, client_secrets_path=CLIENT_SECRETS_PATH, token_path=None):
+        self.user_id = user_id
+        self.token_store = token_store
+        self.client_secrets_path = client_secrets_path
+        self.token_path = token_path
+        self.state = {}
+        self.last_used = time.monotonic()
+        self._creds = None
+        self._service = None
+        self._events_cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def authorized(self):
+        with self._lock:
+            return self._load_credentials() is not None
+
+    def authorize(self):
+        """Run the OAuth consent flow for this user and store the resulting token.
+
+        This blocks until consent is given in a browser, so only call it from
+        an explicit user action, never while rendering a page.
+        """
+        creds = run_oauth_flow(self.client_secrets_path)
+        self._save(creds)
+        with self._lock:
+            self._creds = creds
+            self._service = self._events_cache = None
+
+    def calendar_service(self):
+        """This user's Calendar client, refreshing an expired token first."""
+        with self._lock:
+            creds = self._load_credentials()
+            if creds is None:
+                raise PermissionError(f"{self.user_id} has not connected a Google Calendar yet")
+            refresh_credentials(creds, save=self._save)
+            if self._service is None:
+                self._service = build_calendar_service(creds)
+            return self._service
+
+    def events_cache(self):
+        service = self.calendar_service()
+        with self._lock:
+            if self._events_cache is None:
+                self._events_cache = EventsCache(service)
+            return self._events_cache
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            service, self._service, self._events_cache = self._service, None, None
+        if service is not None and hasattr(service, 'close'):
+            service.close()
+
+    def _load_credentials(self):
+        if self._creds is None:
+            if self.token_path is not None:
+                if os.path.exists(self.token_path):
+                    self._creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+            else:
+                self._creds = self.token_store.load(self.user_id)
+        return self._creds
+
+    def _save(self, creds):
+        if self.token_path is not None:
+            with open(self.token_path, 'w') as token:
+                token.write(creds.to_json())
+        else:
+            self.token_store.save(self.user_id, creds)
+
+class SessionManager:
+    """Keeps at most max_sessions UserSessions, dropping the least recently used and any idle too long.
+
+    Nothing is shared between users except the encrypted token store; an
+    evicted user's token stays on disk, so coming back only rebuilds the
+    in-memory session. LOCAL_USER keeps using local_token_path (token.json).
+    """
+
+    def __init__(self, token_store=None, max_sessions=100, idle_timeout=1800, local_token_path=TOKEN_PATH):
+        self.token_store = token_store or TokenStore()
+        self.local_token_path = local_token_path
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.evictions = 0
+        self._sessions = OrderedDict()  # user_id -> UserSession, least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                token_path = self.local_token_path if user_id == LOCAL_USER else None
+                session = self._sessions[user_id] = UserSession(user_id, self.token_store, token_path=token_path)
+            self._sessions.move_to_end(user_id)
+            session.touch()
+            evicted = self._evict()
+        for old in evicted:
+            old.close()
+        return session
+
+    def close(self, user_id):
+        with self._lock:
+            session = self._sessions.pop(user_id, None)
+        if session is not None:
+            session.close()
+
+    def evict_idle(self):
+        with self._lock:
+            evicted = self._evict()
+        for old in evicted:
+            old.close()
+        return len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._sessions), 'evictions': self.evictions}
+
+    def _evict(self):
+        # Ordered by last use, so idle sessions are always at the front
+        evicted = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            user_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and oldest.last_used >= cutoff:
+                break
+            del self._sessions[user_id]
+            evicted.append(oldest)
+        self.evictions += len(evicted)
+        return evicted
@@ -0,0 +1,183 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from booking_flow import BookingFlow, ContextWindow, PROMPTS, IST, estimate_tokens
+
+NOW = IST.localize(datetime(2025, 7, 1, 10, 0))
+TOMORROW_3PM = IST.localize(datetime(2025, 7, 2, 15, 0))
+FRIDAY_4PM = IST.localize(datetime(2025, 7, 4, 16, 0))
+
+def parse_datetime(text, now=None):
+    # Deliberately naive, like dateparser: a bare length reads as "from now"
+    text = text.lower()
+    if "tomorrow at 3" in text:
+        return TOMORROW_3PM
+    if "friday at 4" in text:
+        return FRIDAY_4PM
+    if "45 minutes" in text:
+        return NOW + timedelta(minutes=45)
+    return None
+
+class FakeExtract:
+    def __init__(self, result=None):
+        self.result = result
+        self.calls = []
+
+    def __call__(self, text, now, context):
+        self.calls.append((text, context))
+        return self.result
+
+def booking(**fields):
+    result = {'intent': 'chat', 'start': None, 'duration_minutes': None, 'title': None, 'attendees': [], 'reply': None}
+    result.update(fields)
+    return result
+
+def confirm_state(flow):
+    flow.handle("book a meeting tomorrow at 3 pm", NOW)
+    flow.handle("Planning", NOW)
+    return flow.handle("1 hour", NOW)
+
+def test_full_booking():
+    flow = BookingFlow(parse_datetime, extract=FakeExtract())
+    assert flow.handle("book a meeting tomorrow at 3 pm", NOW).reply == PROMPTS['ask_title']
+    assert flow.state == 'title'
+    assert flow.handle("Planning", NOW).reply == PROMPTS['ask_duration']
+    assert flow.state == 'duration'
+    step = flow.handle("1 hour", NOW)
+    assert flow.state == 'confirm'
+    assert "'Planning' on 02 July, 2025 at 03:00 PM for 1 hour" in step.reply
+    assert flow.handle("yes", NOW) == (None, 'create')
+    assert flow.created("https://meet.example/abc").reply == PROMPTS['scheduled']
+    assert flow.state == 'idle' and flow.meeting == {}
+
+def test_local_datetime_skips_extract():
+    extract = FakeExtract()
+    flow = BookingFlow(parse_datetime, extract=extract)
+    flow.handle("book a meeting tomorrow at 3 pm for 30 minutes", NOW)
+    assert extract.calls == []
+    assert flow.meeting['duration_minutes'] == 30
+    assert flow.router.stats()['local_turns'] == 1
+
+def test_chat_answered_by_extract():
+    extract = FakeExtract(booking(reply="I'm doing well, thanks!"))
+    flow = BookingFlow(parse_datetime, extract=extract)
+    assert flow.handle("how are you?", NOW) == ("I'm doing well, thanks!", None)
+    assert len(extract.calls) == 1
+    assert flow.router.stats()['local_turns'] == 0
+
+def test_chat_without_reply_falls_back_to_llm():
+    flow = BookingFlow(parse_datetime, extract=FakeExtract(booking()))
+    assert flow.handle("how are you?", NOW) == (None, 'chat')
+
+def test_extracted_booking_fills_answers():
+    extract = FakeExtract(booking(intent='schedule', start='2025-07-02T15:00:00', title='Sync',
+                                  duration_minutes=30, attendees=['bob@example.com']))
+    flow = BookingFlow(parse_datetime, extract=extract)
+    step = flow.handle("set up a sync with Bob the day after the holiday", NOW)
+    assert flow.state == 'confirm'
+    assert "'Sync'" in step.reply
+    assert flow.meeting['attendees'] == ['bob@example.com']
+
+def test_deny_cue_does_not_block_booking():
+    flow = BookingFlow(parse_datetime, extract=FakeExtract())
+    for text in ["No rush, but book a meeting tomorrow at 3 pm",
+                 "Cancel my lunch and book a sync tomorrow at 3 pm"]:
+        flow.reset()
+        assert flow.handle(text, NOW).reply == PROMPTS['ask_title']
+
+def test_title_is_taken_as_said():
+    flow = BookingFlow(parse_datetime)
+    flow.handle("book a meeting tomorrow at 3 pm", NOW)
+    step = flow.handle("Stop-gap review", NOW)
+    assert step.action is None
+    assert flow.meeting['title'] == "Stop-gap review"
+
+def test_exit_resets_the_flow():
+    flow = BookingFlow(parse_datetime)
+    flow.handle("book a meeting tomorrow at 3 pm", NOW)
+    flow.handle("Planning", NOW)
+    assert flow.handle("stop", NOW) == (PROMPTS['ending'], 'exit')
+    assert flow.state == 'idle' and flow.meeting == {}
+
+def test_duration_in_confirm_changes_length_not_start():
+    flow = BookingFlow(parse_datetime)
+    confirm_state(flow)
+    step = flow.handle("45 minutes", NOW)
+    assert flow.state == 'confirm'
+    assert flow.start == TOMORROW_3PM
+    assert flow.meeting['duration_minutes'] == 45
+    assert "for 45 minutes" in step.reply
+
+def test_new_time_in_confirm_moves_meeting():
+    flow = BookingFlow(parse_datetime)
+    confirm_state(flow)
+    flow.handle("no, make it friday at 4 pm", NOW)
+    assert flow.state == 'confirm'
+    assert flow.start == FRIDAY_4PM
+
+def test_deny_in_confirm_drops_meeting():
+    flow = BookingFlow(parse_datetime)
+    confirm_state(flow)
+    assert flow.handle("no", NOW).reply == PROMPTS['not_scheduled']
+    assert flow.state == 'idle' and flow.meeting == {}
+
+def test_failed_creation_resets():
+    flow = BookingFlow(parse_datetime)
+    confirm_state(flow)
+    flow.handle("yes", NOW)
+    assert flow.failed().reply == PROMPTS['calendar_error']
+    assert flow.state == 'idle'
+
+@pytest.mark.parametrize("answers", [[], ["book a meeting tomorrow at 3 pm"],
+                                     ["book a meeting tomorrow at 3 pm", "Planning"],
+                                     ["book a meeting tomorrow at 3 pm", "Planning", "1 hour"]])
+def test_round_trip_through_json(answers):
+    flow = BookingFlow(parse_datetime)
+    for text in answers:
+        flow.handle(text, NOW)
+    data = json.loads(json.dumps(flow.to_dict()))
+    restored = BookingFlow.from_dict(data, parse_datetime)
+    assert restored.to_dict() == flow.to_dict()
+    assert restored.expecting == flow.expecting
+    assert restored.llm_context() == flow.llm_context()
+
+def test_restored_flow_continues():
+    flow = BookingFlow(parse_datetime)
+    flow.handle("book a meeting tomorrow at 3 pm", NOW)
+    flow = BookingFlow.from_dict(json.loads(json.dumps(flow.to_dict())), parse_datetime)
+    assert flow.handle("Planning", NOW).reply == PROMPTS['ask_duration']
+
+def test_llm_context_leaves_out_prompt():
+    extract = FakeExtract(booking(reply="Hi!"))
+    flow = BookingFlow(parse_datetime, extract=extract)
+    flow.handle("hello there", NOW)
+    flow.handle("what can you do?", NOW)
+    text, context = extract.calls[-1]
+    assert text == "what can you do?"
+    assert "User: hello there\nAssistant: Hi!" in context
+    assert "what can you do?" not in context
+
+def test_llm_context_shows_booking_in_progress():
+    flow = BookingFlow(parse_datetime)
+    flow.handle("book a meeting tomorrow at 3 pm", NOW)
+    assert "Booking in progress: start=2025-07-02T15:00:00+05:30" in flow.llm_context()
+
+def test_context_window_stays_within_budget():
+    window = ContextWindow(max_tokens=60, summary_tokens=20)
+    for i in range(50):
+        window.add('user', f"message number {i} about the quarterly planning meeting")
+        window.add('assistant', f"reply number {i} with some details")
+        assert window._turn_tokens() <= window.max_tokens
+        assert estimate_tokens(" ".join(window.summary)) <= window.summary_tokens
+    assert window.turns[-1] == ('assistant', "reply number 49 with some details")
+    assert "Earlier:" in window.render()
+
+def test_context_window_round_trip():
+    window = ContextWindow(max_tokens=40)
+    for i in range(10):
+        window.add('user', f"turn {i} " * 5)
+    restored = ContextWindow.from_dict(json.loads(json.dumps(window.to_dict())), max_tokens=40)
+    assert restored.render() == window.render()
+    assert restored.tokens() == window.tokens()
@@ -0,0 +1,67 @@
+import asyncio
+
+from conversation_pipeline import ConversationEngine, FakeBackends
+
+REPLY = "Sure. I can book that for you. Which title should I use?"
+# Fast playback keeps the suite quick; the LLM delay is what pipelining hides
+DELAYS = {'listen_delay': 0.01, 'synth_delay_per_char': 0.001, 'play_delay_per_char': 0.004}
+
+class RecordingBackends(FakeBackends):
+    """FakeBackends that remember what the LLM was asked and what was played."""
+
+    def __init__(self, utterances, **delays):
+        super().__init__(utterances, **delays)
+        self.prompts = []
+        self.played = []
+
+    def respond(self, text):
+        self.prompts.append(text)
+        yield from super().respond(text)
+
+    def play(self, sentence):
+        self.played.append(sentence)
+        super().play(sentence)
+
+def run_turn(engine):
+    return asyncio.run(engine.run_turn())
+
+def test_pipelined_turn_reaches_first_audio_sooner():
+    latencies = {}
+    for pipelined in (False, True):
+        backends = FakeBackends(["book a meeting tomorrow", "yes"], llm_delay=0.3, **DELAYS)
+        user_text, bot_reply, trace = run_turn(backends.engine(pipelined=pipelined))
+        assert user_text == "book a meeting tomorrow"
+        assert bot_reply == REPLY
+        latencies[pipelined] = trace.between('heard', 'first_audio')
+
+    assert latencies[True] is not None and latencies[False] is not None
+    # The speculative LLM call overlaps the confirmation prompt, saving at least most of llm_delay
+    assert latencies[True] < latencies[False] - 0.2
+
+def test_no_discards_speculative_reply():
+    backends = RecordingBackends(["book a meeting", "no", "book a sync", "yes"], llm_delay=0.2, **DELAYS)
+    engine = ConversationEngine(backends.listen, backends.respond, backends.play, prefetch=backends.prefetch)
+    user_text, bot_reply, trace = run_turn(engine)
+
+    assert user_text == "book a sync"
+    assert bot_reply == REPLY
+    assert backends.prompts == ["book a meeting", "book a sync"]
+    # Only the confirmed request's reply is spoken
+    assert backends.played.count("Sure.") == 1
+    assert "Okay, please repeat your message." in backends.played
+    assert len(engine.traces) == 2
+
+def test_local_turn_skips_the_llm():
+    class Router:
+        def route(self, text, expecting):
+            return text
+        def needs_llm(self, intent):
+            return False
+
+    backends = RecordingBackends(["yes", "yes"], llm_delay=0.2, **DELAYS)
+    engine = ConversationEngine(backends.listen, backends.respond, backends.play, router=Router())
+    user_text, bot_reply, trace = run_turn(engine)
+
+    assert (user_text, bot_reply) == ("yes", "")
+    assert backends.prompts == []
+    assert 'routed_locally' in trace.marks
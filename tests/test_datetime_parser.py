@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+
+from datetime_parser import DateTimeParser, IST
+
+# Tuesday morning
+NOW = IST.localize(datetime(2025, 7, 1, 10, 0))
+
+def at(month, day, hour, minute=0, year=2025):
+    return IST.localize(datetime(year, month, day, hour, minute))
+
+# The phrases benchmark.py times, plus forms the rules must leave to dateparser
+CASES = [
+    ("tomorrow at 3", at(7, 2, 15)),
+    ("next Monday 10 AM", at(7, 7, 10)),
+    ("friday at 4:30 pm", at(7, 4, 16, 30)),
+    ("book a meeting today at 5 pm", at(7, 1, 17)),
+    ("schedule it for the day after tomorrow at noon", at(7, 3, 12)),
+    ("4th July, 2025 at 3:00 PM", at(7, 4, 15)),
+    ("July 10 at 11 am", at(7, 10, 11)),
+    ("can we meet on wednesday at 2", at(7, 2, 14)),
+    ("tonight at 8", at(7, 1, 20)),
+    ("at 9:15 am", at(7, 2, 9, 15)),
+    ("in 2 hours", at(7, 1, 12)),
+    ("an hour", at(7, 1, 11)),
+    ("what's on my calendar", None),
+    ("project sync", None),
+    ("yes please", None),
+    ("on the 25th at 3 pm", at(7, 25, 15)),
+    ("next week at 3 pm", at(7, 8, 15)),
+    ("25/12 at 3 pm", at(12, 25, 15)),
+    ("2026-12-25 at 3 pm", at(12, 25, 15, year=2026)),
+    ("in 3 days at 10 am", at(7, 4, 10)),
+    ("tomorrow at 2", at(7, 2, 14)),
+    ("tomorrow at 2:30", at(7, 2, 14, 30)),
+    ("tomorrow at 07:30", at(7, 2, 7, 30)),
+    ("tomorrow at 9:45", at(7, 2, 9, 45)),
+    ("31 february at 3 pm", None),
+]
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_parse(text, expected):
+    assert DateTimeParser().parse(text, NOW) == expected
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_memoised_result_matches(text, expected):
+    parser = DateTimeParser()
+    parser.parse(text, NOW)
+    assert parser.parse(text, NOW) == expected
+
+def test_past_weekday_time_rolls_to_next_week():
+    assert DateTimeParser().parse("tuesday at 9 am", NOW) == at(7, 8, 9)
+
+def test_time_of_day_phrases_are_not_memoised():
+    parser = DateTimeParser()
+    assert parser.parse("an hour", NOW) == at(7, 1, 11)
+    assert parser.parse("an hour", at(7, 1, 10, 20)) == at(7, 1, 11, 20)
+
+def test_rule_results_are_memoised():
+    parser = DateTimeParser()
+    parser.parse("tomorrow at 3", NOW)
+    parser.parse("tomorrow at 3", at(7, 1, 11))
+    assert parser.stats()['hits'] == 1
+    assert parser.stats()['dateparser_calls'] == 0
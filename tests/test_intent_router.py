@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from intent_router import IntentRouter, parse_duration, mentions_duration
+
+WHEN = datetime(2025, 7, 2, 15, 0)
+
+def parse_datetime(text):
+    # Like dateparser, reads any length as "from now", so the router must strip lengths first
+    return WHEN if "tomorrow" in text or "hour" in text or "minute" in text else None
+
+@pytest.fixture
+def router():
+    return IntentRouter(parse_datetime=parse_datetime)
+
+@pytest.mark.parametrize("text, minutes", [
+    ("1 hour", 60),
+    ("an hour", 60),
+    ("two hours", 120),
+    ("three hours", 180),
+    ("half an hour", 30),
+    ("an hour and a half", 90),
+    ("one and a half hours", 90),
+    ("2 and a half hours", 150),
+    ("1.5 hours", 90),
+    ("1 hour 30 minutes", 90),
+    ("forty five minutes", 45),
+    ("twenty minutes", 20),
+    ("no more than 2 hours", 120),
+    ("45", 45),
+])
+def test_parse_duration(text, minutes):
+    assert parse_duration(text) == minutes
+
+def test_parse_duration_default():
+    assert parse_duration("whenever", default=30) == 30
+
+@pytest.mark.parametrize("text, expected", [
+    ("two hours", True),
+    ("for 30 minutes", True),
+    ("in two hours", False),
+    ("an hour from now", False),
+    ("than the others", False),
+])
+def test_mentions_duration(text, expected):
+    assert mentions_duration(text) is expected
+
+@pytest.mark.parametrize("text, expecting, kind", [
+    ("yes", 'confirm', 'confirm'),
+    ("sure", None, 'confirm'),
+    ("yes, no problem", 'confirm', 'confirm'),
+    ("no", 'confirm', 'deny'),
+    ("No, that's wrong", 'confirm', 'deny'),
+    ("Not sure", 'confirm', 'deny'),
+    ("not sure, maybe", 'confirm', 'deny'),
+    ("I'm not okay with that", 'confirm', 'deny'),
+    ("I don't think that's correct", 'confirm', 'deny'),
+    ("stop", None, 'exit'),
+    ("show me my schedule", None, 'show_schedule'),
+    ("Quarterly planning", 'title', 'title'),
+    ("two hours", 'duration', 'duration'),
+    ("two hours", None, 'duration'),
+    ("in two hours", None, 'datetime'),
+    ("tomorrow at 3 pm for two hours", None, 'datetime'),
+    ("No rush, but book a meeting tomorrow at 3 pm", None, 'datetime'),
+    ("Don't forget: meeting tomorrow at 3 pm", None, 'datetime'),
+    ("how does this work", None, 'chat'),
+])
+def test_route(router, text, expecting, kind):
+    assert router.route(text, expecting).kind == kind
+
+def test_duration_value(router):
+    assert router.route("an hour and a half", 'duration').value == 90
+    assert router.route("two hours", None).value == 120
+
+def test_stats_count_local_turns(router):
+    router.route("yes", 'confirm')
+    intent = router.route("how does this work")
+    router.route("two hours", 'duration')
+    router.escalate(router.route("no", None))
+    assert router.stats()['turns'] == 4
+    assert router.stats()['local_turns'] == 2
+    assert router.needs_llm(intent)
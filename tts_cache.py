@@ -0,0 +1,137 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+class TTSCache:
+    """Content-addressed on-disk store of synthesized audio, evicted LRU by total size.
+
+    Entries are keyed on everything that changes the audio (text, voice,
+    model and output format), so a changed voice never serves stale clips.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.getenv("TTS_CACHE_DIR", ".tts_cache")
+        self.max_bytes = max_bytes or int(os.getenv("TTS_CACHE_MAX_MB", "100")) * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(text, voice_id, model_id, output_format):
+        payload = json.dumps([text, voice_id, model_id, output_format], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._forget(key)
+                self.misses += 1
+                return None
+            os.utime(path)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._forget(key, remove_file=False)
+            self._entries[key] = len(data)
+            self._total += len(data)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                self._forget(next(iter(self._entries)))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self._total,
+        }
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _forget(self, key, remove_file=True):
+        size = self._entries.pop(key, None)
+        if size is None:
+            return
+        self._total -= size
+        if remove_file:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _load_index(self):
+        # Last-modified time doubles as last-used time, since get() touches the file
+        files = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if name.endswith(".tmp") or not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            files.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+
+class CachedBackend:
+    """Wraps a streaming TTS backend, replaying cached clips and recording new ones."""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.sample_rate = backend.sample_rate
+
+    def cache_key(self, text):
+        return self.cache.key(
+            text,
+            getattr(self.backend, "voice_id", None),
+            getattr(self.backend, "model_id", None),
+            f"pcm_{self.sample_rate}"
+        )
+
+    def stream(self, text):
+        key = self.cache_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        for chunk in self.backend.stream(text):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete clips are stored; an interrupted stream raises before this
+        self.cache.put(key, b''.join(chunks))
+
+    def prewarm(self, phrases):
+        for text in phrases:
+            if self.cache_key(text) not in self.cache:
+                for _ in self.stream(text):
+                    pass
@@ -0,0 +1,175 @@
+import math
+import time
+import struct
+import threading
+
+SAMPLE_WIDTH = 2  # 16-bit mono PCM throughout
+
+class PCMRingBuffer:
+    """Fixed-size byte ring between the TTS download thread and the player.
+
+    Reads only ever return whole samples, so chunks split mid-sample by the
+    network are reassembled before they reach the sound card.
+    """
+
+    def __init__(self, capacity=1 << 18, frame_bytes=SAMPLE_WIDTH):
+        self._buf = bytearray(capacity)
+        self._capacity = capacity
+        self._frame_bytes = frame_bytes
+        self._read_pos = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def write(self, data):
+        """Block while the buffer is full; returns False once the reader has gone away."""
+        view = memoryview(data)
+        while view:
+            with self._cond:
+                while self._size == self._capacity and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return False
+                n = min(len(view), self._capacity - self._size)
+                write_pos = (self._read_pos + self._size) % self._capacity
+                first = min(n, self._capacity - write_pos)
+                self._buf[write_pos:write_pos + first] = view[:first]
+                self._buf[:n - first] = view[first:n]
+                self._size += n
+                self._cond.notify_all()
+            view = view[n:]
+        return True
+
+    def read(self, max_bytes):
+        """Block until at least one whole sample is buffered; b'' once closed and drained."""
+        with self._cond:
+            while self._size < self._frame_bytes and not self._closed:
+                self._cond.wait()
+            n = min(self._size, max_bytes)
+            n -= n % self._frame_bytes
+            if n == 0:
+                return b''
+            first = min(n, self._capacity - self._read_pos)
+            data = bytes(self._buf[self._read_pos:self._read_pos + first]) + bytes(self._buf[:n - first])
+            self._read_pos = (self._read_pos + n) % self._capacity
+            self._size -= n
+            self._cond.notify_all()
+            return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+class ElevenLabsBackend:
+    """Streams raw PCM from ElevenLabs, so no MP3 decoding stands in front of playback."""
+
+    def __init__(self, client, voice_id, model_id="eleven_monolingual_v1", sample_rate=22050):
+        self.client = client
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.sample_rate = sample_rate
+
+    def stream(self, text):
+        return self.client.text_to_speech.convert(
+            voice_id=self.voice_id,
+            model_id=self.model_id,
+            text=text,
+            output_format=f"pcm_{self.sample_rate}"
+        )
+
+class FakeStreamBackend:
+    """Offline stand-in that yields a sine tone with network-like delays."""
+
+    def __init__(self, first_chunk_delay=0.3, chunk_delay=0.02, chunk_ms=100, seconds_per_char=0.06, sample_rate=16000):
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_ms = chunk_ms
+        self.seconds_per_char = seconds_per_char
+        self.sample_rate = sample_rate
+
+    def stream(self, text):
+        total = int(len(text) * self.seconds_per_char * self.sample_rate)
+        per_chunk = self.sample_rate * self.chunk_ms // 1000
+        time.sleep(self.first_chunk_delay)
+        for offset in range(0, total, per_chunk):
+            samples = range(offset, min(offset + per_chunk, total))
+            yield struct.pack(
+                f"<{len(samples)}h",
+                *(int(8000 * math.sin(2 * math.pi * 440 * i / self.sample_rate)) for i in samples)
+            )
+            time.sleep(self.chunk_delay)
+
+class PyAudioSink:
+    def __init__(self, sample_rate):
+        import pyaudio
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=sample_rate, output=True)
+
+    def write(self, pcm):
+        self._stream.write(pcm)
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pa.terminate()
+
+class NullSink:
+    """Discards audio, optionally sleeping for its duration to mimic a real device."""
+
+    def __init__(self, sample_rate, realtime=True):
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.bytes_written = 0
+
+    def write(self, pcm):
+        self.bytes_written += len(pcm)
+        if self.realtime:
+            time.sleep(len(pcm) / (SAMPLE_WIDTH * self.sample_rate))
+
+    def close(self):
+        pass
+
+def stream_speech(text, backend, sink, read_bytes=4096):
+    """Play backend audio through sink as it arrives; returns latency metrics in seconds."""
+    start = time.perf_counter()
+    buffer = PCMRingBuffer()
+    errors = []
+
+    def produce():
+        try:
+            for chunk in backend.stream(text):
+                if not buffer.write(chunk):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            buffer.close()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    first_audio = None
+    played = 0
+    try:
+        while True:
+            pcm = buffer.read(read_bytes)
+            if not pcm:
+                break
+            if first_audio is None:
+                first_audio = time.perf_counter() - start
+            sink.write(pcm)
+            played += len(pcm)
+    finally:
+        # Unblocks the producer if playback stopped early
+        buffer.close()
+
+    producer.join()
+    if errors:
+        raise errors[0]
+
+    return {
+        'time_to_first_audio': first_audio,
+        'total_time': time.perf_counter() - start,
+        'audio_seconds': played / (SAMPLE_WIDTH * backend.sample_rate),
+    }
@@ -0,0 +1,178 @@
+import queue
+import threading
+import collections
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+class FrameVAD:
+    """Energy + zero-crossing voice detector with an adaptive noise floor.
+
+    A frame is speech when its energy clears the running noise floor by
+    threshold_ratio and its zero-crossing rate is below that of hiss. The
+    floor only tracks frames judged as non-speech, so a long utterance
+    does not raise it.
+    """
+
+    def __init__(self, threshold_ratio=4.0, min_energy=1e-5, max_zcr=0.4, adapt_rate=0.05):
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.max_zcr = max_zcr
+        self.adapt_rate = adapt_rate
+        self.noise_floor = None
+
+    def is_speech(self, frame):
+        energy = float(np.mean(frame * frame))
+        zcr = float(np.mean(np.abs(np.diff(np.signbit(frame).astype(np.int8)))))
+        if self.noise_floor is None:
+            self.noise_floor = energy
+
+        speech = energy > max(self.noise_floor * self.threshold_ratio, self.min_energy) and zcr < self.max_zcr
+        if not speech:
+            self.noise_floor += self.adapt_rate * (energy - self.noise_floor)
+        return speech
+
+class UtteranceSegmenter:
+    """Cuts a stream of frames into utterances, keeping pre_roll_ms before the onset."""
+
+    def __init__(self, vad=None, frame_ms=FRAME_MS, pre_roll_ms=300, hangover_ms=600,
+                 min_speech_ms=150, max_utterance_s=30.0):
+        self.vad = vad or FrameVAD()
+        self.pre_roll = collections.deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = int(max_utterance_s * 1000 // frame_ms)
+        self.active = []
+        self._speech_frames = 0
+        self._silent_frames = 0
+
+    @property
+    def in_speech(self):
+        return bool(self.active)
+
+    def push(self, frame):
+        """Feed one frame; returns a finished utterance (float32 array) or None."""
+        speech = self.vad.is_speech(frame)
+
+        if not self.active:
+            if speech:
+                self.active = list(self.pre_roll) + [frame]
+                self.pre_roll.clear()
+                self._speech_frames = 1
+                self._silent_frames = 0
+            else:
+                self.pre_roll.append(frame)
+            return None
+
+        self.active.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silent_frames = 0
+        else:
+            self._silent_frames += 1
+
+        if self._silent_frames >= self.hangover_frames or len(self.active) >= self.max_frames:
+            frames, enough = self.active, self._speech_frames >= self.min_speech_frames
+            self.reset()
+            # Clicks and bumps shorter than min_speech_ms are dropped
+            return np.concatenate(frames) if enough else None
+        return None
+
+    def reset(self):
+        self.active = []
+        self.pre_roll.clear()
+        self._speech_frames = 0
+        self._silent_frames = 0
+
+class Listener:
+    """Keeps one microphone stream open and queues utterances as they finish.
+
+    on_speech_start, when set, is called from the capture thread at each
+    utterance onset (used for barge-in). is_playing() (optional) is true
+    while the assistant is talking; unless a barge-in handler is set, what
+    the microphone picks up then is the assistant's own voice and is dropped.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, segmenter=None, is_playing=None):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.segmenter = segmenter or UtteranceSegmenter(frame_ms=frame_ms)
+        self.is_playing = is_playing
+        self.utterances = queue.Queue()
+        self.on_speech_start = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._running.set()
+                self._thread = threading.Thread(target=self._capture, name="listener", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def flush(self, keep_active=False):
+        """Drop queued utterances and, unless keep_active, any speech in progress."""
+        if not keep_active:
+            with self._lock:
+                self.segmenter.reset()
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
+
+    def next_utterance(self, timeout=None):
+        self.start()
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def active_audio(self):
+        """Snapshot of the utterance still being spoken, or None."""
+        with self._lock:
+            frames = list(self.segmenter.active)
+        return np.concatenate(frames) if frames else None
+
+    def feed(self, frame):
+        if self.on_speech_start is None and self.is_playing is not None and self.is_playing():
+            # Echo of a prompt: never let it open (or stay in) an utterance
+            with self._lock:
+                self.segmenter.reset()
+            return
+        with self._lock:
+            was_speaking = self.segmenter.in_speech
+            utterance = self.segmenter.push(frame)
+            started = not was_speaking and self.segmenter.in_speech
+        if started and self.on_speech_start is not None:
+            self.on_speech_start()
+        if utterance is not None:
+            self.utterances.put(utterance)
+
+    def _capture(self):
+        import pyaudio
+        pa = pyaudio.PyAudio()
+        stream = pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            input=True,
+            frames_per_buffer=self.frame_samples
+        )
+        try:
+            while self._running.is_set():
+                data = stream.read(self.frame_samples, exception_on_overflow=False)
+                self.feed(np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0)
+        finally:
+            stream.stop_stream()
+            stream.close()
+            pa.terminate()
@@ -1,122 +1,208 @@
 import os
-import wave
-import time
-import numpy as np
-import whisper
-import pygame
-import tempfile
-import pyaudio
+import asyncio
+import threading
 from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
-from llm_engine import generate_response
+from llm_engine import stream_response
+from tts_cache import TTSCache, CachedBackend
+from conversation_pipeline import ConversationEngine
 
 # Load environment
 load_dotenv()
 api_key = os.getenv("ELEVENLABS_API_KEY")
 voice_id = os.getenv("ELEVENLABS_VOICE_ID")  # Rachel
 
-client = ElevenLabs(api_key=api_key)
-model = whisper.load_model("base")
-
-def record_until_silence(threshold=300, silence_limit=0.5, max_duration=3.5, filename="temp_input.wav"):
-    print("🎙 Listening (volume threshold-based)...")
-
-    CHUNK = 1024
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1
-    RATE = 44100
-
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
-
-    frames = []
-    silence_start = None
-    recording_start = time.time()
-
-    while True:
-        data = stream.read(CHUNK, exception_on_overflow=False)
-        frames.append(data)
-
-        audio_data = np.frombuffer(data, dtype=np.int16)
-        volume = np.linalg.norm(audio_data)
-
-        current_time = time.time()
-        elapsed = current_time - recording_start
-
-        if volume < threshold:
-            if silence_start is None:
-                silence_start = current_time
-            elif current_time - silence_start > silence_limit:
-                print("🛑 Detected sustained silence. Stopping recording.")
-                break
-        else:
-            silence_start = None
-
-        if elapsed > max_duration:
-            print("⏱️ Max recording time reached. Stopping.")
-            break
-
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+TTS_MODEL_ID = "eleven_monolingual_v1"
+
+# Text-only mode reads from the keyboard and prints replies; audio and ASR are never loaded
+TEXT_ONLY = os.getenv("TEXT_ONLY", "").lower() in ("1", "true", "yes")
+
+# Heavy backends (ElevenLabs SDK, numpy/pyaudio capture, pygame) and the TTS cache are created on first use
+_tts_cache = None
+_client = None
+_tts_backend = None
+_audio_output = None
+_listener = None
+_backend_lock = threading.RLock()
+
+def set_text_only(enabled=True):
+    global TEXT_ONLY
+    TEXT_ONLY = enabled
+
+def get_tts_cache():
+    global _tts_cache
+    with _backend_lock:
+        if _tts_cache is None:
+            _tts_cache = TTSCache()
+        return _tts_cache
+
+def get_elevenlabs_client():
+    global _client
+    with _backend_lock:
+        if _client is None:
+            from elevenlabs.client import ElevenLabs
+            _client = ElevenLabs(api_key=api_key)
+        return _client
+
+def get_tts_backend():
+    global _tts_backend
+    with _backend_lock:
+        if _tts_backend is None:
+            from tts_stream import ElevenLabsBackend
+            _tts_backend = CachedBackend(ElevenLabsBackend(get_elevenlabs_client(), voice_id, model_id=TTS_MODEL_ID), get_tts_cache())
+        return _tts_backend
+
+def get_audio_output():
+    global _audio_output
+    with _backend_lock:
+        if _audio_output is None:
+            from audio_output import AudioOutput
+            _audio_output = AudioOutput()
+        return _audio_output
+
+def get_listener():
+    """One capture stream for the whole process, segmented by a frame-level VAD."""
+    global _listener
+    with _backend_lock:
+        if _listener is None:
+            from vad import Listener
+            _listener = Listener(is_playing=is_speaking)
+        return _listener
+
+def stop_listening():
+    """Close the microphone stream; the next listen opens it again."""
+    with _backend_lock:
+        listener = _listener
+    if listener is not None:
+        listener.stop()
+
+def record_until_silence(timeout=None, on_speech=None):
+    """Next utterance from the open microphone stream as float32 audio at 16 kHz."""
+    from vad import SAMPLE_RATE
+    print("🎙 Listening...")
+    listener = get_listener()
+    # Anything finished before this turn is stale; speech in progress is kept, since
+    # the listener never lets the assistant's own prompt open an utterance
+    listener.flush(keep_active=True)
+    listener.on_speech_start = on_speech
+    try:
+        audio = listener.next_utterance(timeout)
+    finally:
+        listener.on_speech_start = None
+    if audio is not None:
+        print(f"🛑 Utterance captured ({len(audio) / SAMPLE_RATE:.1f}s)")
+    return audio
+
+def transcribe_audio(audio):
+    import asr_worker
+    print("📝 Transcribing...")
+    return asr_worker.transcribe(audio)
 
-    with wave.open(filename, 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
+def listen_and_transcribe(timeout=None, on_partial=None):
+    """Transcribe the next utterance while it is spoken; returns the final text."""
+    if TEXT_ONLY:
+        return input("👤 You: ").strip()
 
-    return filename
-
-def transcribe_audio(audio_path):
-    print("📝 Transcribing...")
-    result = model.transcribe(audio_path, fp16=False)
-    return result["text"]
+    import asr_worker
+    print("🎙 Listening (streaming transcription)...")
+    listener = get_listener()
+    listener.flush(keep_active=True)
+    if on_partial is None:
+        on_partial = lambda text: print("…", text)
+    return asr_worker.StreamingTranscriber(listener, on_partial=on_partial).run(timeout)
 
 
 def synthesize_speech(text, voice_id=voice_id):
+    tts_cache = get_tts_cache()
+    key = tts_cache.key(text, voice_id, TTS_MODEL_ID, "mp3")
+    cached = tts_cache.get(key)
+    if cached is not None:
+        return cached
+
     print("🗣️ Synthesizing speech...")
-    audio_stream = client.text_to_speech.convert(
+    audio_stream = get_elevenlabs_client().text_to_speech.convert(
         voice_id=voice_id,
-        model_id="eleven_monolingual_v1",
+        model_id=TTS_MODEL_ID,
         text=text
     )
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-        for chunk in audio_stream:
-            tmp.write(chunk)
-        return tmp.name
+    audio = b''.join(audio_stream)
+    tts_cache.put(key, audio)
+    return audio
 
-def play_audio(file_path):
+def play_audio(audio, wait=True):
     print("🔊 Playing...")
-    pygame.init()
-    pygame.mixer.init()
-    pygame.mixer.music.load(file_path)
-    pygame.mixer.music.play()
-    while pygame.mixer.music.get_busy():
-        continue
-    pygame.quit()
-
-def synthesize_and_speak(text):
-    path = synthesize_speech(text)
-    play_audio(path)
-
-def run_voice_agent(confirm=True):
-    audio_path = record_until_silence()
-    user_text = transcribe_audio(audio_path)
+    future = get_audio_output().play(audio)
+    return future.result() if wait else future
+
+def speak_streaming(text, backend=None, wait=True):
+    if TEXT_ONLY:
+        print("🤖", text)
+        return None
+
+    print("🗣️ Streaming speech...")
+    future = get_audio_output().speak(text, backend or get_tts_backend())
+    if not wait:
+        return future
+    metrics = future.result()
+    if metrics and metrics['time_to_first_audio'] is not None:
+        print(f"🔊 First audio after {metrics['time_to_first_audio']:.2f}s")
+    return metrics
+
+def synthesize_and_speak(text, wait=True):
+    return speak_streaming(text, wait=wait)
+
+def respond_and_speak(prompt, wait=True, context=None):
+    """Stream the LLM reply into TTS sentence by sentence; returns the full reply text."""
+    sentences = []
+    future = None
+    for sentence in stream_response(prompt, context):
+        sentences.append(sentence)
+        future = speak_streaming(sentence, wait=False)
+    if wait and future is not None:
+        future.result()
+    return " ".join(sentences)
+
+def stop_speaking():
+    if _audio_output is not None:
+        _audio_output.cancel()
+
+def is_speaking():
+    return _audio_output is not None and _audio_output.is_playing()
+
+def prewarm_tts(phrases):
+    """Synthesize fixed prompts into the TTS cache in the background."""
+    if TEXT_ONLY:
+        return
+    phrases = list(phrases)
+
+    def warm():
+        try:
+            get_tts_backend().prewarm(phrases)
+        except Exception as e:
+            print("⚠️ TTS pre-warm failed:", e)
+    threading.Thread(target=warm, daemon=True).start()
+
+def prefetch_speech(text):
+    if not TEXT_ONLY:
+        get_tts_backend().prewarm([text])
+
+def run_voice_agent(confirm=True, expecting=None, router=None, respond=None, speculate=True):
+    engine = ConversationEngine(
+        listen=listen_and_transcribe,
+        respond=respond or stream_response,
+        speak=synthesize_and_speak,
+        prefetch=prefetch_speech,
+        # Typed input needs no "did you say" check
+        confirm=confirm and not TEXT_ONLY,
+        router=router,
+        speculate=speculate
+    )
+    user_text, bot_reply, trace = asyncio.run(engine.run_turn(expecting))
     print("👤 You said:", user_text)
-
-    if confirm:
-        synthesize_and_speak(f"Did you say: {user_text}? Please say yes or no.")
-        confirmation_path = record_until_silence()
-        confirmation = transcribe_audio(confirmation_path)
-
-        if "no" in confirmation.lower():
-            synthesize_and_speak("Okay, please repeat your message.")
-            return run_voice_agent(confirm=True)
-
-    bot_reply = generate_response(user_text)
     print("🤖 Assistant:", bot_reply)
-    synthesize_and_speak(bot_reply)
+    print("⏱️", trace.summary())
+    if router is not None:
+        stats = router.stats()
+        print(f"🧭 Served locally: {stats['local_turns']}/{stats['turns']} turns ({stats['local_ratio']:.0%})")
 
     return user_text, bot_reply
 
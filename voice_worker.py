@@ -0,0 +1,149 @@
+import time
+import queue
+import threading
+
+class VoiceWorker:
+    """Runs one session's listen -> transcribe loop on a background thread.
+
+    The UI never blocks on the microphone, Whisper, the LLM or TTS: it polls
+    drain() for (kind, value) events and answers each heard utterance with
+    reply(text, context) to have the worker generate and speak an LLM reply, or
+    resume() when it handled the utterance itself. Event kinds are
+    'status' ('listening', 'processing', 'speaking'), 'heard', 'reply' and
+    'error'.
+
+    listen(timeout) -> audio or None, transcribe(audio) -> text and
+    respond(text, context=...) -> reply text are blocking callables; is_busy() (optional)
+    is true while the assistant is still talking. With barge_in the worker
+    keeps listening then, so listen can cut playback short when the user
+    starts speaking; without it, it waits so its own voice isn't taken for
+    the user's. With heartbeat_timeout set, the worker stops by itself once
+    drain() hasn't been called for that many seconds (its page went away).
+    on_exit() (optional) runs on the worker thread once it has stopped, however
+    it was stopped.
+    """
+
+    def __init__(self, listen, transcribe, respond, is_busy=None, listen_timeout=1.0, barge_in=True,
+                 heartbeat_timeout=None, on_exit=None):
+        self.listen = listen
+        self.transcribe = transcribe
+        self.respond = respond
+        self.is_busy = is_busy
+        self.listen_timeout = listen_timeout
+        self.barge_in = barge_in
+        self.heartbeat_timeout = heartbeat_timeout
+        self.on_exit = on_exit
+        self.events = queue.Queue()
+        self._answers = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_drain = time.monotonic()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._last_drain = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="voice-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def reply(self, text, context=None):
+        self._answers.put((text, context))
+
+    def resume(self):
+        self._answers.put(None)
+
+    def drain(self):
+        """Every event posted since the last call, oldest first."""
+        self._last_drain = time.monotonic()
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _post(self, kind, value=None):
+        self.events.put((kind, value))
+
+    def _stopped(self):
+        if self.heartbeat_timeout is not None and time.monotonic() - self._last_drain > self.heartbeat_timeout:
+            if not self._stop.is_set():
+                print("🔇 Voice worker abandoned by its page; stopping")
+            self._stop.set()
+        return self._stop.is_set()
+
+    def _run(self):
+        try:
+            while not self._stopped():
+                try:
+                    self._turn()
+                except Exception as e:
+                    self._post('error', str(e))
+                    self._stop.wait(self.listen_timeout)
+        finally:
+            if self.on_exit is not None:
+                self.on_exit()
+        self._post('status', 'ready')
+
+    def _turn(self):
+        busy = self.is_busy is not None and self.is_busy()
+        if busy and not self.barge_in:
+            self._post('status', 'speaking')
+            while self.is_busy() and not self._stop.wait(0.1) and not self._stopped():
+                pass
+            return
+
+        self._post('status', 'speaking' if busy else 'listening')
+        # Short timeouts keep stop() responsive while nobody is talking
+        audio = self.listen(self.listen_timeout)
+        if audio is None or not len(audio) or self._stopped():
+            return
+
+        self._post('status', 'processing')
+        text = self.transcribe(audio)
+        if not text:
+            return
+        self._post('heard', text)
+
+        answer = self._wait_for_answer()
+        if answer is not None:
+            self._post('status', 'processing')
+            prompt, context = answer
+            self._post('reply', self.respond(prompt, context=context))
+
+    def _wait_for_answer(self):
+        while not self._stopped():
+            try:
+                return self._answers.get(timeout=self.listen_timeout)
+            except queue.Empty:
+                continue
+        return None
+
+class VoiceSlot:
+    """The process has one microphone and one Listener: at most one running worker may hold them."""
+
+    def __init__(self):
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def acquire(self, worker):
+        with self._lock:
+            if self._worker is not None and self._worker is not worker and self._worker.running:
+                return False
+            self._worker = worker
+            return True
+
+    def release(self, worker):
+        """Give the slot up; True if worker was still holding it (nobody else took over)."""
+        with self._lock:
+            if self._worker is worker:
+                self._worker = None
+                return True
+            return False